@@ -1,11 +1,12 @@
-from typing import Dict, Type
+from typing import Dict, Type, Any
 from .abc import AbstractCache
 from .nocache import NoCache
 from .simple import SimpleCache
 from .request_local import RequestLocalCache
-from .memcached import MemcachedCache
+from .memcached import MemcachedCache, BatchingMemcachedCache
 from .trace import TraceCache
-from ..types import TCache
+from ..errors import ConfigurationError
+from ..types import TCache, CacheEngineName
 
 
 CACHE_ENGINE_MAP: Dict[str, Type[TCache]] = {
@@ -13,5 +14,24 @@ CACHE_ENGINE_MAP: Dict[str, Type[TCache]] = {
     "simple": SimpleCache,
     "request_local": RequestLocalCache,
     "memcached": MemcachedCache,
+    "memcached_batching": BatchingMemcachedCache,
     "trace": TraceCache
 }
+
+
+def create_cache_engine(name: CacheEngineName, *args: Any, **kwargs: Any) -> AbstractCache:
+    match name:
+        case "no_cache":
+            return NoCache(*args, **kwargs)
+        case "simple":
+            return SimpleCache(*args, **kwargs)
+        case "request_local":
+            return RequestLocalCache(*args, **kwargs)
+        case "memcached":
+            return MemcachedCache(*args, **kwargs)
+        case "memcached_batching":
+            return BatchingMemcachedCache(*args, **kwargs)
+        case "trace":
+            return TraceCache(*args, **kwargs)
+        case _:
+            raise ConfigurationError(f"invalid cache engine \"{name}\"")
@@ -1,16 +1,35 @@
-from typing import Optional, Any, TypeVar
+import inspect
+import functools
+from typing import Optional, Any, Iterable
 from abc import ABC, abstractmethod
 
 
 class AbstractCache(ABC):
 
+    __slots__ = ()
+
     NAME: str
 
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        get = cls.__dict__.get("get")
+        if get is None:
+            return
+        try:
+            inspect.signature(get).bind(None, "key", None)
+        except TypeError:
+            # engines written for the former get(key) signature report misses as None
+            @functools.wraps(get)
+            async def get_with_default(self, key: str, default: Any = None) -> Optional[Any]:
+                value = await get(self, key)
+                return default if value is None else value
+            cls.get = get_with_default
+
     @abstractmethod
     async def initialise(self) -> None: ...
 
     @abstractmethod
-    async def get(self, key: str) -> Optional[Any]: ...
+    async def get(self, key: str, default: Any = None) -> Optional[Any]: ...
 
     @abstractmethod
     async def set(self, key: str, value: Any) -> None: ...
@@ -20,3 +39,8 @@ class AbstractCache(ABC):
 
     @abstractmethod
     async def delete(self, key: str) -> None: ...
+
+    async def delete_many(self, keys: Iterable[str]) -> None:
+        # engines able to delete in batches override this
+        for key in keys:
+            await self.delete(key)
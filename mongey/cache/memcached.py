@@ -1,43 +1,173 @@
 import asyncio
 import functools
+import weakref
 import binascii
+import struct
 import pickle
-from typing import Optional, Any, List, Tuple
+import marshal
+from datetime import datetime
+from typing import Optional, Any, Iterable, List, Dict, Tuple, Callable, Awaitable, Literal
 
 import aiomcache
 from aiomcache import Client
+from bson import ObjectId
 from .abc import AbstractCache
+from ..errors import ConfigurationError
+
+try:
+    import msgpack
+except ImportError:  # msgpack is an optional dependency
+    msgpack = None
 
 MAX_RETRIES: int = 5
+RETRIABLE_ERRORS = (aiomcache.ClientException, OSError)
+MAX_BATCH: int = 64
+
+# connections per backend, coroutines beyond the pool size wait for a free connection.
+# Every process opens its own pools, so larger ones are opt-in via pool_size
+DEFAULT_POOL_SIZE: int = 2
+DEFAULT_POOL_MINSIZE: Optional[int] = None
+
+SerializerName = Literal["pickle", "msgpack", "marshal"]
+
+# msgpack extension type codes for non-native values
+MSGPACK_EXT_OBJECTID = 1
+MSGPACK_EXT_DATETIME = 2
+MSGPACK_EXT_PICKLE = 3
+
+# marshal serializer payload tags
+MARSHAL_TAG = b"M"
+PICKLE_TAG = b"P"
+MARSHAL_VERSION = 4
+
+# resolves batched lookups of the keys missing in cache
+_NOT_FOUND = object()
+
+# hosts running different python versions may share memcached, so the protocol
+# is pinned to a fixed version instead of DEFAULT_PROTOCOL or HIGHEST_PROTOCOL
+PICKLE_PROTOCOL = 5
+_DUMPS = functools.partial(pickle.dumps, protocol=PICKLE_PROTOCOL)
 
 
 def pick_and_retry(func):
 
     @functools.wraps(func)
     async def wrapper(self, key, *args, **kwargs):
+        if not self._n:
+            return None
+        mask = self._mask
+        basehash = key_hash(key)
+        serverhash = basehash
         retry = 0
         while True:
-            backend, key = self._get_backend(key, retry)
+            idx = serverhash & mask if mask is not None else serverhash % self._n
+            backend = self._backends[idx]
             try:
-                data = await func(self, backend, key, *args, **kwargs)
-                return data
-            except Exception:
+                return await func(self, backend, key, *args, **kwargs)
+            except aiomcache.ValidationException:
+                # invalid keys/values won't get any better on another backend
+                raise
+            except RETRIABLE_ERRORS:
                 retry += 1
                 if retry > MAX_RETRIES:
                     raise
+                serverhash = retry_hash(basehash, retry)
     return wrapper
 
 
 def server_hash_func(key):
-    return (((binascii.crc32(key) & 0xffffffff) >> 16) & 0x7fff) or 1
+    # binascii.crc32 is always unsigned in python3, no extra masking needed
+    return ((binascii.crc32(key) >> 16) & 0x7fff) or 1
+
+
+def key_hash(key: str) -> int:
+    """
+    server_hash_func for str keys. Model cache keys embed object ids and are
+    mostly distinct, so the hashes are computed on every call, not memoized
+    """
+    return server_hash_func(key.encode())
+
+
+_pack_retry = struct.Struct("<IB").pack
+
+
+def retry_hash(serverhash: int, retry: int) -> int:
+    return server_hash_func(_pack_retry(serverhash, retry))
+
+
+def _msgpack_default(obj: Any) -> Any:
+    if isinstance(obj, ObjectId):
+        return msgpack.ExtType(MSGPACK_EXT_OBJECTID, obj.binary)
+    if isinstance(obj, datetime):
+        return msgpack.ExtType(MSGPACK_EXT_DATETIME, obj.isoformat().encode())
+    # anything msgpack can't handle natively falls back to pickle
+    return msgpack.ExtType(MSGPACK_EXT_PICKLE, _DUMPS(obj))
+
+
+def _msgpack_ext_hook(code: int, data: bytes) -> Any:
+    if code == MSGPACK_EXT_OBJECTID:
+        return ObjectId(data)
+    if code == MSGPACK_EXT_DATETIME:
+        return datetime.fromisoformat(data.decode())
+    if code == MSGPACK_EXT_PICKLE:
+        return pickle.loads(data)
+    return msgpack.ExtType(code, data)
+
+
+def _msgpack_dumps(value: Any) -> bytes:
+    return msgpack.packb(value, use_bin_type=True, default=_msgpack_default)
+
+
+def _msgpack_loads(data: bytes) -> Any:
+    return msgpack.unpackb(data, raw=False, ext_hook=_msgpack_ext_hook)
+
+
+def _marshal_dumps(value: Any) -> bytes:
+    try:
+        return MARSHAL_TAG + marshal.dumps(value, MARSHAL_VERSION)
+    except ValueError:
+        # marshal only supports builtin types, e.g. ObjectId or datetime values need pickle
+        return PICKLE_TAG + _DUMPS(value)
+
+
+def _marshal_loads(data: bytes) -> Any:
+    tag, payload = data[:1], memoryview(data)[1:]
+    if tag == MARSHAL_TAG:
+        return marshal.loads(payload)
+    if tag == PICKLE_TAG:
+        return pickle.loads(payload)
+    raise ValueError(f"unknown payload tag {tag!r}")
 
 
 class MemcachedCache(AbstractCache):
 
+    __slots__ = ("_backends", "_n", "_mask", "_dumps", "_loads")
+
     NAME = "MemcachedCache"
     _backends: List[Client]
+    _n: int
+    _mask: Optional[int]
+    _dumps: Callable[[Any], bytes]
+    _loads: Callable[[bytes], Any]
+
+    def __init__(self,
+                 backends: List[str],
+                 serializer: SerializerName = "pickle",
+                 *,
+                 pool_size: int = DEFAULT_POOL_SIZE,
+                 pool_minsize: Optional[int] = DEFAULT_POOL_MINSIZE) -> None:
+        match serializer:
+            case "pickle":
+                self._dumps, self._loads = _DUMPS, pickle.loads
+            case "msgpack":
+                if msgpack is None:
+                    raise ConfigurationError("msgpack serializer requires msgpack package to be installed")
+                self._dumps, self._loads = _msgpack_dumps, _msgpack_loads
+            case "marshal":
+                self._dumps, self._loads = _marshal_dumps, _marshal_loads
+            case _:
+                raise ConfigurationError(f"invalid memcached serializer \"{serializer}\"")
 
-    def __init__(self, backends: List[str]) -> None:
         clients: List[Client] = []
 
         for backend in backends:
@@ -49,28 +179,15 @@ class MemcachedCache(AbstractCache):
             client = Client(
                 chunks[0],
                 port,
-                pool_size=2,
-                pool_minsize=None,
+                pool_size=pool_size,
+                pool_minsize=pool_minsize,
             )
             clients.append(client)
 
         self._backends = clients
-
-    def _get_backend(self, key: str | Tuple, retry: int = 0) -> Tuple[Optional[Client], Optional[str]]:
-        if not self._backends:
-            return None, None
-
-        if isinstance(key, tuple):
-            serverhash, key = key
-        else:
-            serverhash = server_hash_func(key.encode("utf-8"))
-
-        if retry > 0:
-            serverhash = str(serverhash) + str(retry)
-            serverhash = server_hash_func(serverhash.encode('utf-8'))
-
-        server = self._backends[serverhash % len(self._backends)]
-        return server, key
+        self._n = len(clients)
+        # with a power-of-two number of backends the shard index is a cheap bitwise AND
+        self._mask = self._n - 1 if self._n and not self._n & (self._n - 1) else None
 
     async def has(self, key: str) -> bool:
         value = await self.get(key)
@@ -81,7 +198,7 @@ class MemcachedCache(AbstractCache):
         await backend.set(key.encode(), value)
 
     async def set(self, key: str, value: Any) -> None:
-        value = pickle.dumps(value)
+        value = self._dumps(value)
         try:
             await self._set(key, value)
         except aiomcache.ValidationException:
@@ -89,27 +206,190 @@ class MemcachedCache(AbstractCache):
 
     @pick_and_retry
     async def _get(self, backend: Client, key: str) -> Optional[Any]:
-        return await backend.get(key.encode("utf-8"))
+        return await backend.get(key.encode())
 
-    async def get(self, key: str) -> Optional[Any]:
+    async def get(self, key: str, default: Any = None) -> Optional[Any]:
         try:
             res = await self._get(key)
+        except aiomcache.ValidationException:
+            return default
+        if res is None:
+            return default
+        try:
+            return self._loads(res)
+        except Exception:
+            return default
+
+    @staticmethod
+    async def _get_valid(backend: Client, key: str) -> Optional[bytes]:
+        try:
+            return await backend.get(key.encode())
         except aiomcache.ValidationException:
             return None
-        if res is not None:
+
+    async def _get_shard(self, backend: Client, keys: List[str]) -> Dict[str, Any]:
+        try:
+            values = await backend.multi_get(*(key.encode() for key in keys))
+        except aiomcache.ValidationException:
+            # a single invalid key fails the whole multi_get, so the keys
+            # are fetched one by one not to turn the valid ones into misses
+            values = await asyncio.gather(*(self._get_valid(backend, key) for key in keys))
+        result = {}
+        for key, res in zip(keys, values):
+            if res is None:
+                continue
             try:
-                value = pickle.loads(res)
-                return value
+                result[key] = self._loads(res)
             except Exception:
-                return None
+                continue
+        return result
+
+    async def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """
+        Fetches multiple keys at once issuing one multi_get per backend,
+        all the backends are queried concurrently.
+        Only the keys found in cache are present in the result
+        """
+        if not self._n:
+            return {}
+
+        mask = self._mask
+        shard_map: Dict[int, List[str]] = {}
+        for key in keys:
+            serverhash = key_hash(key)
+            idx = serverhash & mask if mask is not None else serverhash % self._n
+            shard_map.setdefault(idx, []).append(key)
+
+        tasks = [self._get_shard(self._backends[idx], shard_keys) for idx, shard_keys in shard_map.items()]
+        result = {}
+        for values in await asyncio.gather(*tasks):
+            result.update(values)
+        return result
 
     async def delete(self, key: str) -> bool:
+        bkey = key.encode()
         try:
-            tasks = [backend.delete(key.encode("utf-8")) for backend in self._backends]
+            if self._n == 1:
+                return bool(await self._backends[0].delete(bkey))
+            # the value may have been stored to a retry backend, so
+            # the key is deleted from all of them
+            tasks = [backend.delete(bkey) for backend in self._backends]
             results = await asyncio.gather(*tasks)
         except aiomcache.ValidationException:
             return False
         return any(results)
 
+    async def delete_many(self, keys: Iterable[str]) -> None:
+        # memcached text protocol has no multi-key delete, the deletes
+        # are sent concurrently over the connection pools instead
+        await asyncio.gather(*(self.delete(key) for key in keys))
+
     async def initialise(self) -> None:
         return
+
+
+class BatchingMemcachedCache(MemcachedCache):
+    """
+    BatchingMemcachedCache coalesces get() calls issued within the same event
+    loop iteration into multi_get requests, one per backend and up to
+    max_batch keys each. The batch is flushed on the next loop tick, so no
+    latency is added beyond that
+    """
+
+    __slots__ = ("_max_batch", "_batches", "_tasks")
+
+    NAME = "BatchingMemcachedCache"
+    _max_batch: int
+    _batches: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, List[asyncio.Future]]]"
+    _tasks: set[asyncio.Task]
+
+    def __init__(self,
+                 backends: List[str],
+                 serializer: SerializerName = "pickle",
+                 max_batch: int = MAX_BATCH,
+                 *,
+                 pool_size: int = DEFAULT_POOL_SIZE,
+                 pool_minsize: Optional[int] = DEFAULT_POOL_MINSIZE) -> None:
+        super().__init__(backends, serializer, pool_size=pool_size, pool_minsize=pool_minsize)
+        self._max_batch = max_batch
+        self._batches = weakref.WeakKeyDictionary()
+        self._tasks = set()
+
+    async def get(self, key: str, default: Any = None) -> Optional[Any]:
+        if not self._n:
+            return default
+        loop = asyncio.get_running_loop()
+        batch = self._batches.get(loop)
+        if batch is None:
+            # the first get in this loop iteration schedules the flush
+            batch = self._batches[loop] = {}
+            loop.call_soon(self._flush, loop)
+        fut = loop.create_future()
+        batch.setdefault(key, []).append(fut)
+        value = await fut
+        return default if value is _NOT_FOUND else value
+
+    def _flush(self, loop: asyncio.AbstractEventLoop) -> None:
+        batch = self._batches.pop(loop, None)
+        if not batch:
+            return
+        keys = list(batch)
+        for i in range(0, len(keys), self._max_batch):
+            waiters = {key: batch[key] for key in keys[i:i + self._max_batch]}
+            task = self._spawn(loop, self._resolve(waiters))
+            # a flush cancelled before or while running must not leave the waiters pending
+            task.add_done_callback(functools.partial(self._fail_pending, waiters))
+
+    def _spawn(self, loop: asyncio.AbstractEventLoop, coro: Awaitable[Any]) -> asyncio.Task:
+        task = loop.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._task_done)
+        return task
+
+    def _task_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled():
+            # the errors are passed on to the waiters, they must not be reported as never retrieved
+            task.exception()
+
+    @staticmethod
+    def _fail_pending(waiters: Dict[str, List[asyncio.Future]], _: asyncio.Task) -> None:
+        for futures in waiters.values():
+            for fut in futures:
+                if not fut.done():
+                    fut.set_exception(aiomcache.ClientException("batched get interrupted"))
+
+    async def _fetch(self, keys: List[str]) -> Tuple[Dict[str, Any], Dict[str, Exception]]:
+        errors: Dict[str, Exception] = {}
+        try:
+            values = await self.get_many(keys)
+        except RETRIABLE_ERRORS:
+            # multi_get has no retry logic, fall back to single gets picking other backends
+            values = {}
+            for key in keys:
+                try:
+                    values[key] = await super().get(key, _NOT_FOUND)
+                except Exception as e:
+                    errors[key] = e
+        return values, errors
+
+    async def _resolve(self, waiters: Dict[str, List[asyncio.Future]]) -> None:
+        try:
+            # the requests run in a task of their own which is shielded from cancellation:
+            # aiomcache returns a connection cancelled halfway through a request to the
+            # pool with the reply unread, and the next request on it would read that reply
+            fetch = self._spawn(asyncio.get_running_loop(), self._fetch(list(waiters)))
+            values, errors = await asyncio.shield(fetch)
+        except Exception as e:
+            values, errors = {}, dict.fromkeys(waiters, e)
+
+        for key, futures in waiters.items():
+            error = errors.get(key)
+            value = values.get(key, _NOT_FOUND)
+            for fut in futures:
+                if fut.done():
+                    continue
+                if error is None:
+                    fut.set_result(value)
+                else:
+                    fut.set_exception(error)
@@ -1,16 +1,18 @@
-from typing import Any, Optional
+from typing import Any, Iterable, Optional
 from .abc import AbstractCache
 
 
 class NoCache(AbstractCache):
 
+    __slots__ = ()
+
     NAME = "NoCache"
 
     async def initialise(self) -> None:
         pass
 
-    async def get(self, key: str) -> Optional[Any]:
-        return None
+    async def get(self, key: str, default: Any = None) -> Optional[Any]:
+        return default
 
     async def set(self, key: str, value: Any) -> None:
         pass
@@ -20,3 +22,6 @@ class NoCache(AbstractCache):
 
     async def delete(self, key: str) -> None:
         pass
+
+    async def delete_many(self, keys: Iterable[str]) -> None:
+        pass
@@ -1,5 +1,5 @@
 from contextvars import ContextVar
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterable
 from .abc import AbstractCache
 
 REQUEST_CACHE_CONTEXT_KEY = "request_cache"
@@ -9,6 +9,8 @@ req_cache_ctx: ContextVar[Optional[Dict[str, Any]]] = ContextVar(REQUEST_CACHE_C
 
 class RequestLocalCache(AbstractCache):
 
+    __slots__ = ("ctxvar",)
+
     NAME = "RequestLocalCache"
 
     ctxvar: ContextVar[Optional[Dict[str, Any]]]
@@ -19,18 +21,18 @@ class RequestLocalCache(AbstractCache):
     async def initialise(self) -> None:
         pass
 
-    async def get(self, key: str) -> Optional[Any]:
+    async def get(self, key: str, default: Any = None) -> Optional[Any]:
         cache = self.ctxvar.get()
         if cache is None:
-            return None
-        return cache.get(key)
+            return default
+        return cache.get(key, default)
 
     async def set(self, key: str, value: Any) -> None:
         cache = self.ctxvar.get()
         if cache is None:
             return None
+        # the dict is mutated in place, no need to set it to ctxvar again
         cache[key] = value
-        self.ctxvar.set(cache)
 
     async def has(self, key: str) -> bool:
         cache = self.ctxvar.get()
@@ -42,6 +44,11 @@ class RequestLocalCache(AbstractCache):
         cache = self.ctxvar.get()
         if cache is None:
             return None
-        if key in cache:
-            del cache[key]
-            self.ctxvar.set(cache)
+        cache.pop(key, None)
+
+    async def delete_many(self, keys: Iterable[str]) -> None:
+        cache = self.ctxvar.get()
+        if cache is None:
+            return None
+        for key in keys:
+            cache.pop(key, None)
@@ -1,27 +1,51 @@
-from typing import Any, Optional, Dict
+from typing import Any, Iterable, Optional
+from collections import OrderedDict
 from .abc import AbstractCache
 
-__static_cache__: Dict[str, Any] = {}
+DEFAULT_MAX_ITEMS: int = 10_000
 
 
 class SimpleCache(AbstractCache):
+    """
+    SimpleCache is an in-process LRU cache bounded by max_items.
+    The least recently used entries are evicted when the limit is exceeded
+    """
+
+    __slots__ = ("_d", "_max_items")
 
     NAME = "SimpleCache"
 
+    _d: "OrderedDict[str, Any]"
+    _max_items: int
+
+    def __init__(self, max_items: int = DEFAULT_MAX_ITEMS) -> None:
+        self._d = OrderedDict()
+        self._max_items = max_items
+
     async def initialise(self) -> None:
         from mongey.context import ctx
         ctx.log.warn("SimpleCache is not suitable for production, use with caution")
 
-    async def get(self, key: str) -> Optional[Any]:
-        return __static_cache__.get(key)
+    async def get(self, key: str, default: Any = None) -> Optional[Any]:
+        try:
+            value = self._d[key]
+        except KeyError:
+            return default
+        self._d.move_to_end(key)
+        return value
 
     async def set(self, key: str, value: Any) -> None:
-        global __static_cache__
-        __static_cache__[key] = value
+        self._d[key] = value
+        self._d.move_to_end(key)
+        if len(self._d) > self._max_items:
+            self._d.popitem(last=False)
 
     async def has(self, key: str) -> bool:
-        return key in __static_cache__
+        return key in self._d
 
     async def delete(self, key: str) -> None:
-        if key in __static_cache__:
-            del __static_cache__[key]
+        self._d.pop(key, None)
+
+    async def delete_many(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            self._d.pop(key, None)
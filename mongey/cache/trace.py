@@ -1,14 +1,16 @@
-from typing import Optional, Any, Dict, List, Literal, Tuple
+from typing import Optional, Any, Counter, Dict, Iterable, List, Literal, Tuple
+from collections import Counter as CallCounter
 from dataclasses import dataclass
 from .abc import AbstractCache
 
 
 CallMethod = Literal["has", "get", "set", "delete"]
+CallOps = Counter[Tuple[CallMethod, str]]
 
 
-@dataclass
+@dataclass(slots=True)
 class Call:
-    args: List[Any]
+    args: Tuple[Any, ...]
 
 
 class TraceCache(AbstractCache):
@@ -18,6 +20,8 @@ class TraceCache(AbstractCache):
     all the calls and saves them for further checking / asserting
     """
 
+    __slots__ = ("calls",)
+
     NAME = "TraceCache"
 
     calls: Dict[CallMethod, List[Call]]
@@ -35,62 +39,90 @@ class TraceCache(AbstractCache):
         }
 
     async def has(self, key: str) -> bool:
-        self.calls["has"].append(Call(args=[key]))
+        self.calls["has"].append(Call(args=(key,)))
         return False
 
     async def set(self, key: str, value: Any) -> None:
-        self.calls["set"].append(Call(args=[key, value]))
+        self.calls["set"].append(Call(args=(key, value)))
         return
 
-    async def get(self, key: str) -> Optional[Any]:
-        self.calls["get"].append(Call(args=[key]))
-        return None
+    async def get(self, key: str, default: Any = None) -> Optional[Any]:
+        self.calls["get"].append(Call(args=(key,)))
+        return default
 
     async def delete(self, key: str) -> bool:
-        self.calls["delete"].append(Call(args=[key]))
+        self.calls["delete"].append(Call(args=(key,)))
         return False
 
+    async def delete_many(self, keys: Iterable[str]) -> None:
+        # traced as separate deletes, so assertions don't depend on
+        # whether the keys were deleted in a batch or one by one
+        self.calls["delete"].extend(Call(args=(key,)) for key in keys)
+
     async def initialise(self) -> None:
         return
 
     @staticmethod
-    def _setup_filter(args: Tuple[Any, ...]):
-        if args:
-            def flt(x: Call):
-                return x.args == list(args)
-        else:
-            def flt(x: Call):
-                return x
-        return flt
+    def _count(calls: List[Call], args: Tuple[Any, ...], limit: Optional[int] = None) -> int:
+        """
+        counts calls matching args (any call matches if args are empty),
+        stops counting as soon as the limit is reached
+        """
+        if not args:
+            return len(calls)
+        cnt = 0
+        for call in calls:
+            if call.args == args:
+                cnt += 1
+                if cnt == limit:
+                    break
+        return cnt
 
     def called_once(self, method: CallMethod, *args: Any) -> None:
-        flt = self._setup_filter(args)
-        calls = list(filter(flt, self.calls[method]))
+        cnt = self._count(self.calls[method], args)
         args_message = f" with args {args}" if args else ""
-        if len(calls) < 1:
+        if cnt < 1:
             raise AssertionError(f"method {method} was not called{args_message}")
-        if len(calls) > 1:
-            raise AssertionError(f"method {method} was called {len(calls)} times{args_message}")
+        if cnt > 1:
+            raise AssertionError(f"method {method} was called {cnt} times{args_message}")
 
     def called_times(self, method: CallMethod, times: int, *args: Any) -> None:
-        flt = self._setup_filter(args)
-        calls = list(filter(flt, self.calls[method]))
-        if len(calls) != times:
+        cnt = self._count(self.calls[method], args)
+        if cnt != times:
             args_message = f" with args {args}" if args else ""
             raise AssertionError(
-                f"method {method} was called {len(calls)} times{args_message} ({times} times expected)"
+                f"method {method} was called {cnt} times{args_message} ({times} times expected)"
             )
 
     def called(self, method: CallMethod, *args: Any) -> None:
-        flt = self._setup_filter(args)
-        calls = list(filter(flt, self.calls[method]))
-        if len(calls) == 0:
+        if self._count(self.calls[method], args, limit=1) == 0:
             args_message = f" with args {args}" if args else ""
             raise AssertionError(f"method {method} was not called{args_message}")
 
     def not_called(self, method: CallMethod, *args: Any) -> None:
-        flt = self._setup_filter(args)
-        calls = list(filter(flt, self.calls[method]))
-        if len(calls) != 0:
+        cnt = self._count(self.calls[method], args)
+        if cnt != 0:
             args_message = f" with args {args}" if args else ""
-            raise AssertionError(f"method {method} was called{args_message} {len(calls)} times")
+            raise AssertionError(f"method {method} was called{args_message} {cnt} times")
+
+    def snapshot_ops(self) -> CallOps:
+        """
+        drains the traced calls into a counter of (method, key) pairs, so that
+        a number of calls can be checked without rescanning the log every time.
+        The trace is reset, calls made afterwards go to the next snapshot
+        """
+        ops = CallCounter((method, call.args[0]) for method, calls in self.calls.items() for call in calls)
+        self.reset()
+        return ops
+
+    @staticmethod
+    def assert_called(ops: CallOps, method: CallMethod, key: str, times: int = 1) -> None:
+        """
+        checks a snapshot_ops() counter for the number of (method, key) calls,
+        the checked pair is removed from the counter
+        """
+        cnt = ops.pop((method, key), 0)
+        if cnt != times:
+            raise AssertionError(
+                f"method {method} was called {cnt} times with key {key!r} ({times} times expected)"
+            )
@@ -207,6 +207,19 @@ class Shard:
         cursor = self.conn[collection].find(query, projection=projection, **kwargs)
         return cursor
 
+    @intercept_pymongo_errors
+    async def get_ids(self,
+                      collection: str,
+                      query: QueryType,
+                      max_count: Optional[int] = None,
+                      **kwargs: Dict[str, Any]) -> List[ObjectId]:
+        cursor = self.conn[collection].find(query, projection={"_id": 1}, **kwargs)
+        if max_count:
+            cursor = cursor.limit(max_count)
+        # ids are collected while the cursor is streamed, without
+        # keeping the list of the documents they come from
+        return [obj["_id"] async for obj in cursor]
+
     @intercept_pymongo_errors
     def get_aggregated(
         self,
@@ -325,10 +338,13 @@ class DB:
         self.__shards = {}
 
     def configure(self, config: DatabaseConfig, mock: bool = False) -> None:
+        from mongey.models.storable_model import StorableModel
         self.__meta = Shard(config["meta"], mock=mock)
         self.__shards = {}
         for shard, shard_config in config["shards"].items():
             self.__shards[shard] = Shard(shard_config, mock)
+        # models keep the shard they were resolved to
+        StorableModel._db.cache_clear()
 
     @property
     def meta(self) -> Shard:
@@ -1,11 +1,43 @@
+import asyncio
 import inspect
-from typing import Generic, List, Any, Dict, Callable, Type, Awaitable
-from time import time
-from functools import wraps
+from logging import DEBUG
+from typing import Generic, List, Any, Dict, Set, Callable, Type, Awaitable
+from time import perf_counter_ns
+from functools import wraps, partial
 from mongey.errors import ObjectSaveRequired
 from mongey.context import ctx
+from mongey.cache.abc import AbstractCache
+from mongey.cache.nocache import NoCache
+from mongey.cache.memcached import MemcachedCache
 from mongey.types import TModel, T, RT
 
+# instance attribute holding values of model_cached_method methods already fetched by the instance
+CACHED_VALUES_ATTR = "_cached_values"
+
+# L2 lookups left running after an L1 hit. They are never cancelled: aiomcache
+# returns a connection cancelled halfway through a request to its pool with the
+# reply unread, and the next request on it would read that reply instead of its own
+_detached_lookups: Set[asyncio.Task] = set()
+
+
+def _detach(task: asyncio.Task) -> None:
+    _detached_lookups.add(task)
+    task.add_done_callback(_detached_done)
+
+
+def _detached_done(task: asyncio.Task) -> None:
+    _detached_lookups.discard(task)
+    if not task.cancelled():
+        # no one is waiting for the result, errors included
+        task.exception()
+
+
+def _lookup_done(inflight: Dict[str, asyncio.Task], cache_key: str, task: asyncio.Task) -> None:
+    del inflight[cache_key]
+    if not task.cancelled():
+        # the error is raised to the callers, if any of them are still waiting
+        task.exception()
+
 
 def save_required(func: Callable[..., T]) -> Callable[..., T]:
     """
@@ -48,15 +80,11 @@ class api_field(Generic[RT]):
         from .models.fields import ComputedField
         fd = ComputedField(is_async=inspect.iscoroutinefunction(self.fn))
 
-        # computed_fields are inherited from MetaModel down the class tree
-        # here we make sure every descendant does not modify parents' computed fields
-
-        computed_fields = owner.computed_fields.copy()
-        for base in owner.__bases__:
-            if hasattr(base, "computed_fields"):
-                computed_fields.update(base.computed_fields)
-        computed_fields[name] = fd
-        owner.computed_fields = computed_fields
+        # __set_name__ runs before MetaModel.__init_subclass__ which merges
+        # the inherited computed fields, so here we only need to make sure
+        # the owner has its own dict not to modify parents' computed fields
+        if "computed_fields" not in owner.__dict__:
+            owner.computed_fields = {}
         owner.computed_fields[name] = fd
         setattr(owner, name, self.fn)
 
@@ -76,8 +104,17 @@ class model_cached_method(Generic[RT]):
     being returned
 
     The methods wrapped with this decorator are automatically added to a
-    class property called _cached_methods: set. This allows StorableModel.invalidate
+    class property called _cached_methods: frozenset. This allows StorableModel.invalidate
     method to invalidate these cached values along with other model-provided cache.
+
+    Once fetched, the value is also memoized in the model instance itself, so
+    repeated calls on the same instance don't hit any cache at all. The memo
+    lives as long as the instance and is only dropped by the instance's own
+    invalidate() and reload() methods. Invalidations made with invalidate_many,
+    update_many, destroy_many or through another instance of the same document
+    don't reach it, neither does reconfiguring ctx caches at runtime, so
+    long-lived instances keep returning the memoized values until reloaded.
+    None values are never memoized as None means "not cached".
     """
     orig_func: Callable[..., Awaitable[RT]]
 
@@ -92,38 +129,96 @@ class model_cached_method(Generic[RT]):
         return self.orig_func(*args, **kwds)
 
     def __set_name__(self, owner: Type[TModel], name: str) -> None:
-
-        @wraps(self.orig_func)
-        async def wrapper(this: TModel, *args, **kwargs) -> RT:
-            cache_key = f"{this.collection}.{this.id}.{self.orig_func.__name__}"
-
-            t1 = time()
-            value = await ctx.l1_cache.get(cache_key)
+        # lookups currently in progress by cache key. Concurrent calls for
+        # the same key wait for the first one instead of querying caches
+        # and calling the original method on their own. The lookups run in
+        # tasks of their own and are never cancelled, see _detached_lookups
+        inflight: Dict[str, asyncio.Task] = {}
+        func = self.orig_func
+        func_name = func.__name__
+
+        async def fetch(l1: AbstractCache, l2: AbstractCache, this: TModel, cache_key: str, *args, **kwargs) -> RT:
+            log = ctx.log
+            # timings are only measured if they are going to be logged
+            debug = log.isEnabledFor(DEBUG)
+
+            l2_task = None
+            if isinstance(l1, MemcachedCache):
+                # L1 is remote as well, L2 is queried concurrently not to
+                # pay for two sequential round trips on L1 miss
+                l2_task = asyncio.ensure_future(l2.get(cache_key))
+
+            if debug:
+                t1 = perf_counter_ns()
+            try:
+                value = await l1.get(cache_key)
+            except BaseException:
+                if l2_task is not None:
+                    _detach(l2_task)
+                raise
             if value is not None:
-                td = time() - t1
-                ctx.log.debug(
-                    "%s L1 hit %s %.3f secs", ctx.l1_cache.NAME, cache_key, td
-                )
+                if l2_task is not None:
+                    _detach(l2_task)
+                if debug:
+                    td = (perf_counter_ns() - t1) / 1e9
+                    log.debug("%s L1 hit %s %.3f secs", l1.NAME, cache_key, td)
                 return value
 
-            t1 = time()
-            value = await ctx.l2_cache.get(cache_key)
+            if l2_task is not None:
+                value = await l2_task
+            else:
+                if debug:
+                    t1 = perf_counter_ns()
+                value = await l2.get(cache_key)
             if value is not None:
-                td = time() - t1
-                ctx.log.debug(
-                    "%s L2 hit %s %.3f secs", ctx.l2_cache.NAME, cache_key, td
-                )
-                await ctx.l1_cache.set(cache_key, value)
+                if debug:
+                    td = (perf_counter_ns() - t1) / 1e9
+                    log.debug("%s L2 hit %s %.3f secs", l2.NAME, cache_key, td)
+                await l1.set(cache_key, value)
                 return value
 
-            t1 = time()
-            value = await self.orig_func(this, *args, **kwargs)
-            td = time() - t1
-            ctx.log.debug("%s miss %s %.3f secs", ctx.l2_cache.NAME, cache_key, td)
-            await ctx.l2_cache.set(cache_key, value)
-            await ctx.l1_cache.set(cache_key, value)
+            if debug:
+                t1 = perf_counter_ns()
+            value = await func(this, *args, **kwargs)
+            if debug:
+                td = (perf_counter_ns() - t1) / 1e9
+                log.debug("%s miss %s %.3f secs", l2.NAME, cache_key, td)
+            await asyncio.gather(
+                l2.set(cache_key, value),
+                l1.set(cache_key, value),
+            )
+            return value
 
+        @wraps(func)
+        async def wrapper(this: TModel, *args, **kwargs) -> RT:
+            # the engines are resolved once per call, ctx caches may be reconfigured at runtime
+            l1 = ctx.l1_cache
+            l2 = ctx.l2_cache
+            if type(l1) is NoCache and type(l2) is NoCache:
+                # caching is not configured, no reason to go through the cache layers
+                return await func(this, *args, **kwargs)
+
+            # values already fetched by this very instance are served without awaiting any cache
+            memo = this.__dict__.get(CACHED_VALUES_ATTR)
+            if memo is None:
+                memo = this.__dict__[CACHED_VALUES_ATTR] = {}
+            elif name in memo:
+                return memo[name]
+
+            cache_key = this._cache_key_id_prefix + func_name
+
+            lookup = inflight.get(cache_key)
+            if lookup is None:
+                lookup = asyncio.ensure_future(fetch(l1, l2, this, cache_key, *args, **kwargs))
+                inflight[cache_key] = lookup
+                lookup.add_done_callback(partial(_lookup_done, inflight, cache_key))
+            # shielded, cancelling a caller, including the one which started the lookup,
+            # cancels neither the lookup nor the other callers
+            value = await asyncio.shield(lookup)
+            if value is not None:
+                memo[name] = value
             return value
 
-        owner._cached_methods.add(name)
+        # MetaModel collects the marked methods into the owner's _cached_methods
+        wrapper.__model_cached_method__ = True
         setattr(owner, name, wrapper)
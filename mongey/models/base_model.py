@@ -1,15 +1,23 @@
-from typing import Dict, Any, Sequence, Optional, Type, List
-from copy import deepcopy
+import asyncio
+from functools import cached_property
+from typing import Dict, Any, Sequence, Optional, Type, List, Tuple
 from pymongo.errors import OperationFailure
 from ..errors import DoNotSave, ObjectHasReferences
 from ..db import Shard, ObjectsCursor
 from ..context import ctx
 from ..types import TBaseModel, TPydanticModel
-from .fields import ObjectIdField, OnDestroy
+from .fields import Field, ObjectIdField
 from .meta_model import MetaModel
 
 undef = object()
 
+# returned by _before_validation or _before_save hooks to cancel the save
+# without raising DoNotSave, aborted saves are as cheap as the regular ones
+ABORT_SAVE = object()
+
+# to_dict() field selections memoized per model class, see BaseModel._to_dict_plan
+MAX_TO_DICT_PLANS: int = 256
+
 
 class BaseModel(MetaModel):
 
@@ -19,24 +27,52 @@ class BaseModel(MetaModel):
     def __init__(self, attrs: Optional[Dict[str, Any]] = None, **_kwargs: Dict[str, Any]) -> None:
         if attrs is None:
             attrs = {}
-
-        for field, descriptor in self._fields.items():
-            if field == "id":
-                value = attrs.get("_id", undef)
-            else:
-                value = attrs.get(field, undef)
-            if value is undef:
-                descriptor.set_default(self)
-            else:
-                # setting via __dict__ will ignore descriptors
-                setattr(self, field, value)
+        # generated per model class by MetaModel, see compile_init_fields
+        self._init_fields(attrs)
         self._set_initial_state()
 
     async def validate_all(self) -> None:
-        for descriptor in self._fields.values():
-            await descriptor.validate(self)
+        if self._has_async_fields:
+            for descriptor in self._fields.values():
+                await descriptor.validate(self)
+        else:
+            self.validate_all_sync()
         await self.validate()
 
+    def validate_all_sync(self) -> None:
+        """
+        Runs the field checks without awaiting anything, only possible if none
+        of the model fields has async checks. Unlike validate_all, the model's
+        own validate() is not called as it's a coroutine
+        """
+        if self._has_async_fields:
+            raise RuntimeError(f"{type(self).__name__} has fields with async checks, use validate_all")
+        # generated per model class by MetaModel, see compile_validate_fields
+        self._validate_fields()
+
+    @classmethod
+    async def validate_many(cls, models: Sequence["BaseModel"]) -> None:
+        """
+        validate_all() for a batch of models. The batch is validated field by field
+        rather than model by model, async field checks run concurrently for all the
+        models of the batch. Models of different classes (e.g. submodels) are
+        validated against their own fields
+        """
+        by_class: Dict[Type[BaseModel], List[BaseModel]] = {}
+        for model in models:
+            by_class.setdefault(type(model), []).append(model)
+
+        for model_cls, batch in by_class.items():
+            for descriptor in model_cls._fields.values():
+                if type(descriptor).validate is not Field.validate:
+                    await asyncio.gather(*(descriptor.validate(model) for model in batch))
+                else:
+                    for model in batch:
+                        descriptor.validate_sync(model)
+
+        for model in models:
+            await model.validate()
+
     async def validate(self) -> None:
         pass
 
@@ -44,52 +80,79 @@ class BaseModel(MetaModel):
     def is_new(self) -> bool:
         return self.id is None
 
+    @cached_property
+    def _cache_key_id_prefix(self) -> str:
+        """
+        Common prefix of the model instance cache keys, i.e. "<collection>.<id>."
+        It's cached in the instance and reset whenever the id may change
+        """
+        return f"{self._cache_key_prefix}{self.id}."
+
+    def _reset_cache_key_id_prefix(self) -> None:
+        self.__dict__.pop("_cache_key_id_prefix", None)
+
     def _set_initial_state(self) -> None:
+        values = self.__dict__
         self._initial_state = {
-            field: deepcopy(getattr(self, field))
-            for field in self._fields
+            field: descriptor.clone(values[field])
+            for field, descriptor in self._field_items
         }
 
     def is_modified(self) -> bool:
-        for field in self._fields:
-            value = self.__dict__[field]
-            if value != self._initial_state[field]:
+        values = self.__dict__
+        initial_state = self._initial_state
+        for field in self._field_names:
+            value = values[field]
+            initial = initial_state[field]
+            # unchanged immutable values are shared with the initial state
+            if value is initial:
+                continue
+            if value != initial:
                 return True
         return False
 
     async def _check_refs_on_destroy(self):
-        if self._references:
-            ref_classes = set()
-            for ref in self._references:
-                if ref.on_destroy == OnDestroy.RAISE:
-                    refs = await ref.ref_class.find({ref.ref_field: self.id}).all()
-                    if len(refs) > 0:
-                        ref_classes.add(ref.ref_class.__name__)
-                elif ref.on_destroy == OnDestroy.CASCADE:
-                    await ref.ref_class.destroy_many({ref.ref_field: self.id})
-                elif ref.on_destroy == OnDestroy.DETACH:
-                    await ref.ref_class.update_many(
-                        {ref.ref_field: self.id},
-                        {"$set": {
-                            ref.ref_field: None
-                        }}
-                    )
-            if len(ref_classes) > 0:
+        if not self._references:
+            return
+
+        raise_refs, cascade_refs, detach_refs = self._bucket_refs()
+        if raise_refs:
+            # all the RAISE references are checked before any of the
+            # cascade/detach operations is run, so nothing is modified
+            # if the object can't be destroyed
+            found = await asyncio.gather(
+                *(ref.ref_class.find_one({ref.ref_field: self.id}) for ref in raise_refs)
+            )
+            ref_classes = [ref.ref_class.__name__ for ref, item in zip(raise_refs, found) if item is not None]
+            if ref_classes:
                 raise ObjectHasReferences(
-                    f"{self.__class__.__name__} has dangling references of types {list(ref_classes)}"
+                    f"{self.__class__.__name__} has dangling references of types {list(dict.fromkeys(ref_classes))}"
                 )
 
+        if cascade_refs or detach_refs:
+            await asyncio.gather(
+                *(ref.ref_class.destroy_many({ref.ref_field: self.id}) for ref in cascade_refs),
+                *(ref.ref_class.update_many(
+                    {ref.ref_field: self.id},
+                    {"$set": {
+                        ref.ref_field: None
+                    }}
+                ) for ref in detach_refs),
+            )
+
     async def references(self) -> List[TBaseModel]:
+        results = await asyncio.gather(
+            *(model_ref.ref_class.find({model_ref.ref_field: self.id}).all() for model_ref in self._references)
+        )
         refs = []
-        for model_ref in self._references:
-            items = await model_ref.ref_class.find({model_ref.ref_field: self.id}).all()
+        for items in results:
             refs.extend(items)
         return refs
 
-    async def _before_save(self) -> None:
+    async def _before_save(self) -> Any:
         pass
 
-    async def _before_validation(self) -> None:
+    async def _before_validation(self) -> Any:
         pass
 
     async def _before_delete(self) -> None:
@@ -124,6 +187,7 @@ class BaseModel(MetaModel):
             await self._after_delete()
 
         self.id = None
+        self._reset_cache_key_id_prefix()
         return self
 
     async def save(self: TBaseModel, skip_callback: bool = False, invalidate_cache: bool = True) -> TBaseModel:
@@ -131,14 +195,16 @@ class BaseModel(MetaModel):
 
         if not skip_callback:
             try:
-                await self._before_validation()
+                if await self._before_validation() is ABORT_SAVE:
+                    return self
             except DoNotSave:
                 return self
         await self.validate_all()
 
         if not skip_callback:
             try:
-                await self._before_save()
+                if await self._before_save() is ABORT_SAVE:
+                    return self
             except DoNotSave:
                 return self
 
@@ -146,6 +212,8 @@ class BaseModel(MetaModel):
             await self.invalidate()
 
         await self._save_to_db()
+        if is_new:
+            self._reset_cache_key_id_prefix()
 
         self._set_initial_state()
         if not skip_callback:
@@ -154,47 +222,63 @@ class BaseModel(MetaModel):
         return self
 
     def __repr__(self) -> str:
-        attributes = ["%s=%r" % (a, getattr(self, a)) for a in self._fields]
+        attributes = ["%s=%r" % (a, getattr(self, a)) for a in self._field_names]
         return "%s(\n    %s\n)" % (self.__class__.__name__, ",\n    ".join(attributes))
 
     def __eq__(self: "BaseModel", other: "BaseModel") -> bool:
-        if self.__class__ != other.__class__:
+        if type(self) is not type(other):
             return False
-        for field in self._fields:
-            if hasattr(self, field):
-                if not hasattr(other, field):
-                    return False
-                if getattr(self, field) != getattr(other, field):
-                    return False
-            elif hasattr(other, field):
+        values = self.__dict__
+        other_values = other.__dict__
+        for field in self._field_names:
+            if values.get(field, undef) != other_values.get(field, undef):
                 return False
         return True
 
+    # models are mutable, thus unhashable
+    __hash__ = None
+
     def __ne__(self: "BaseModel", other: "BaseModel") -> bool:
         return not self.__eq__(other)
 
+    def _all_fields_to_dict(self, include_restricted: bool, convert_id: bool) -> Dict[str, Any]:
+        # fast path for serializing all the fields, restricted ones are filtered out beforehand
+        values = self.__dict__
+        result = {}
+        for field in self._field_names if include_restricted else self._public_field_names:
+            value = values[field]
+            if callable(value):
+                continue
+            if field == "id" and convert_id:
+                field = "_id"
+            result[field] = value
+        return result
+
     async def to_dict_ext(self,
                           fields: Sequence[str] | None = None,
                           include_restricted: bool = False,
                           convert_id: bool = False) -> Dict[str, Any]:
         if fields is None:
-            fields = self._fields.keys()
+            # no computed fields are involved, nothing to await
+            return self._all_fields_to_dict(include_restricted, convert_id)
 
+        values = self.__dict__
+        serializable = self._serializable
         result = {}
         for field_name in fields:
-            descriptor = self._fields.get(field_name)
-            if descriptor is not None:
-                if descriptor.restricted and not include_restricted:
+            entry = serializable.get(field_name)
+            if entry is None:
+                continue
+            restricted, computed = entry
+            if computed is None:
+                if restricted and not include_restricted:
                     continue
-                value = getattr(self, field_name)
+                value = values[field_name]
                 if field_name == "id" and convert_id:
                     field_name = "_id"
                 if callable(value):
                     continue
             else:
-                computed = self.computed_fields.get(field_name)
-                if not computed:
-                    continue
                 value = getattr(self, field_name)()
                 if computed.is_async:
                     value = await value
@@ -209,22 +293,42 @@ class BaseModel(MetaModel):
                 include_restricted: bool = False,
                 convert_id: bool = False) -> Dict[str, Any]:
         if fields is None:
-            fields = self._fields.keys()
-        field_descriptors = ((f, self._fields.get(f)) for f in fields)
+            return self._all_fields_to_dict(include_restricted, convert_id)
 
+        values = self.__dict__
         result = {}
-        for field, descriptor in field_descriptors:
+        for field, key in self._to_dict_plan(tuple(fields), include_restricted, convert_id):
+            value = values[field]
+            if callable(value):
+                continue
+            result[key] = value
+        return result
+
+    @classmethod
+    def _to_dict_plan(cls,
+                      fields: Tuple[str, ...],
+                      include_restricted: bool,
+                      convert_id: bool) -> Tuple[Tuple[str, str], ...]:
+        """
+        (attribute, result key) pairs for a given to_dict() call signature.
+        Only the field selection is memoized, values are always read from the instance
+        """
+        plan_key = (fields, include_restricted, convert_id)
+        plan = cls._to_dict_plans.get(plan_key)
+        if plan is not None:
+            return plan
+        plan = []
+        for field in fields:
+            descriptor = cls._fields.get(field)
             if descriptor is None:
                 continue
             if descriptor.restricted and not include_restricted:
                 continue
-            value = getattr(self, field)
-            if callable(value):
-                continue
-            if field == "id" and convert_id:
-                field = "_id"
-            result[field] = value
-        return result
+            plan.append((field, "_id" if field == "id" and convert_id else field))
+        plan = tuple(plan)
+        if len(cls._to_dict_plans) < MAX_TO_DICT_PLANS:
+            cls._to_dict_plans[plan_key] = plan
+        return plan
 
     @classmethod
     def create(cls: Type[TBaseModel], **attrs: Any) -> TBaseModel:
@@ -276,20 +380,20 @@ class BaseModel(MetaModel):
                                 )
 
     def _reload_from_model(self: TBaseModel, obj: TBaseModel) -> None:
-        for field in self._fields:
+        for field in self._field_names:
             if field == "_id":
                 continue
             value = getattr(obj, field)
 
             # setting via __dict__ will ignore descriptors
             setattr(self, field, value)
+        self._reset_cache_key_id_prefix()
 
     @classmethod
     def exposed_fields(cls) -> List[str]:
-        fields = cls.exposed_base_fields()
-        fields.extend(cls.computed_fields.keys())
-        return fields
+        # a new list every time, callers are free to modify it
+        return list(cls._exposed_field_names)
 
     @classmethod
     def exposed_base_fields(cls) -> List[str]:
-        return [field for field, descriptor in cls._fields.items() if not descriptor.restricted]
+        return list(cls._public_field_names)
@@ -5,6 +5,9 @@ from .fields import StringField, IntField
 from ..errors import IntegrityError
 from ..context import ctx
 
+_COUNTER_INC = {"$inc": {"counter": 1}}
+_COUNTER_PROJ = {"counter": 1, "_id": 0}
+
 
 class Counter(BaseModel):
     """
@@ -23,17 +26,31 @@ class Counter(BaseModel):
         coll = ctx.db.meta.conn[cls.collection]
         result = await coll.find_one_and_update(
             {"key": key},
-            {"$inc": {"counter": 1}},
+            _COUNTER_INC,
             upsert=True,
             return_document=ReturnDocument.AFTER
         )
         return cls(result)
 
+    @classmethod
+    async def next_value(cls, key: str) -> int:
+        """
+        Increments the counter and returns the new value without
+        fetching the whole document and constructing a Counter
+        """
+        coll = ctx.db.meta.conn[cls.collection]
+        result = await coll.find_one_and_update(
+            {"key": key},
+            _COUNTER_INC,
+            projection=_COUNTER_PROJ,
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return result["counter"]
+
     @classmethod
     async def get_counter(cls, key: str) -> int:
-        cnt = await cls.get(key)
-        assert cnt.counter is not None
-        return cnt.counter
+        return await cls.next_value(key)
 
     async def next(self) -> "Counter":
         if not self.key:
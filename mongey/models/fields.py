@@ -1,7 +1,11 @@
 import re
+import sys
 import inspect
+import functools
 from abc import ABC
-from typing import Callable, Generic, Hashable, Protocol, Tuple, TypeVar, Type, Iterable, overload
+from copy import deepcopy
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any, Callable, Generic, Hashable, Protocol, Tuple, TypeVar, Type, Iterable, overload
 from numbers import Real
 from bson import ObjectId
 from datetime import datetime
@@ -13,6 +17,35 @@ from .reference import OnDestroy, ModelReference
 
 T = TypeVar("T")
 
+# a single validation check, takes the field value and raises ValidationError
+Check = Callable[[Any], None]
+
+# values of these types can be shared between the model state and its initial state snapshot
+IMMUTABLE_TYPES = frozenset({type(None), str, int, float, bool, bytes, frozenset, ObjectId, datetime})
+
+# index options are shared by all the fields, read-only views keep them from being modified
+_DEFAULT_INDEX_OPTIONS: IndexOptions = MappingProxyType(IndexOptions())  # type: ignore[assignment]
+_UNIQUE_INDEX_OPTIONS: IndexOptions = MappingProxyType(IndexOptions(unique=True))  # type: ignore[assignment]
+
+
+def _fast_snapshot(value: Any) -> Any:
+    """
+    Returns a copy of the value which can't be affected by modifying the original.
+    Immutables are returned as is, flat containers are copied shallowly,
+    anything else is deep-copied
+    """
+    t = type(value)
+    if t in IMMUTABLE_TYPES:
+        return value
+    if t is list or t is set:
+        if all(type(item) in IMMUTABLE_TYPES for item in value):
+            return value.copy()
+    elif t is dict:
+        if all(type(item) in IMMUTABLE_TYPES for item in value.values()):
+            return value.copy()
+    return deepcopy(value)
+
+
 TBaseFieldDescriptor = TypeVar(
     "TBaseFieldDescriptor",
     bound="BaseFieldDescriptor",
@@ -20,36 +53,43 @@ TBaseFieldDescriptor = TypeVar(
 
 
 class BaseFieldDescriptor(Generic[T]):
-    name: str = ""
+    """
+    Field values live in the model instance __dict__ under the field name.
+    The descriptor defines neither __get__ nor __set__ at runtime, so reading
+    and writing a field is a plain instance attribute access. Subclasses that
+    need to transform values on assignment (like StringField) define __set__
+    and store the value to __dict__ themselves.
+    """
+    __slots__ = ("name",)
 
-    def __set__(self, obj: object, value: T | None) -> None:
-        obj.__dict__[self.name] = value
+    name: str
 
     def __set_name__(self, owner: Type[object], name: str) -> None:
-        self.name = name
-
-    @overload
-    def __get__(
-        self: "TBaseFieldDescriptor[T]",
-        obj: None,
-        objtype: Type[object] | None = None
-    ) -> "TBaseFieldDescriptor[T]": ...
-
-    @overload
-    def __get__(
-        self: "TBaseFieldDescriptor[T]",
-        obj: object,
-        objtype: Type[object] | None = None
-    ) -> T | None: ...
-
-    def __get__(
-        self: "TBaseFieldDescriptor[T]",
-        obj: object | None,
-        objtype: Type[object] | None = None
-    ) -> T | None | "TBaseFieldDescriptor[T]":
-        if obj is None:
-            return self
-        return obj.__dict__[self.name]
+        self.name = sys.intern(name)
+
+    if TYPE_CHECKING:
+        # only meant for type checkers, the values are read from the instance __dict__
+        @overload
+        def __get__(
+            self: "TBaseFieldDescriptor[T]",
+            obj: None,
+            objtype: Type[object] | None = None
+        ) -> "TBaseFieldDescriptor[T]": ...
+
+        @overload
+        def __get__(
+            self: "TBaseFieldDescriptor[T]",
+            obj: object,
+            objtype: Type[object] | None = None
+        ) -> T | None: ...
+
+        def __get__(
+            self: "TBaseFieldDescriptor[T]",
+            obj: object | None,
+            objtype: Type[object] | None = None
+        ) -> T | None | "TBaseFieldDescriptor[T]": ...
+
+        def __set__(self, obj: object, value: T | None) -> None: ...
 
 
 class FieldProto(Protocol):
@@ -59,6 +99,8 @@ class FieldProto(Protocol):
     index_options: IndexOptions
 
     def set_default(self, obj: object) -> None: ...
+    def clone(self, value: Any) -> Any: ...
+    def validate_sync(self, obj: object) -> None: ...
     async def validate(self, obj: object) -> None: ...
 
 
@@ -67,15 +109,43 @@ IndexInput = bool | IndexSpec | None
 
 class Field(BaseFieldDescriptor[T]):
 
+    __slots__ = (
+        "required",
+        "rejected",
+        "restricted",
+        "index",
+        "index_options",
+        "choices",
+        "def_value",
+        "strict",
+        "_checks",
+    )
+
     required: bool
     rejected: bool
     restricted: bool
     index: IndexSpec | None
     index_options: IndexOptions
-    choices: set[T] | None
+    choices: frozenset[T] | None
     def_value: T | Callable[[], T] | None
+    # accept the explicit types only and not their subclasses, e.g. a bool is not a valid IntField value
+    strict: bool
+    _checks: tuple[Check, ...]
+
+    # lets MetaModel recognize fields with a plain attribute lookup instead of isinstance
+    __is_mongey_field__: bool = True
 
     __explicit_types__: Iterable[Type] = []
+    # derived from __explicit_types__ for every Field subclass in __init_subclass__
+    __explicit_type_tuple__: tuple[Type, ...] = ()
+    __explicit_type_frozenset__: frozenset[Type] = frozenset()
+    # the default of the strict argument for the fields of the class
+    __strict_types__: bool = False
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        cls.__explicit_type_tuple__ = tuple(cls.__explicit_types__)
+        cls.__explicit_type_frozenset__ = frozenset(cls.__explicit_types__)
 
     def __init__(
         self,
@@ -87,16 +157,22 @@ class Field(BaseFieldDescriptor[T]):
         index: IndexInput | None = None,
         unique: bool = False,
         choices: Iterable[T] | None = None,
+        strict: bool | None = None,
     ) -> None:
         self.required = required
+        self.strict = self.__strict_types__ if strict is None else strict
         self.rejected = rejected
         self.restricted = restricted
         if choices:
-            self.choices = set(choices)
+            # shared by the checks, an immutable set can't be changed from the outside
+            self.choices = frozenset(choices)
         else:
             self.choices = None
         self.def_value = default
         self.index, self.index_options = self.__generate_index(index, unique)
+        # both are set up in __set_name__ once the field is assigned to a model
+        self.name = ""
+        self._checks = ()
 
     def set_default(self, obj: object) -> None:
         value = self.def_value
@@ -104,52 +180,99 @@ class Field(BaseFieldDescriptor[T]):
             value = value()
         setattr(obj, self.name, value)
 
+    def clone(self, value: T | None) -> T | None:
+        """
+        Returns a copy of the value safe to be stored in the model initial state
+        """
+        return _fast_snapshot(value)
+
     @staticmethod
     def __generate_index(
         index: IndexInput, unique: bool
     ) -> Tuple[IndexSpec | None, IndexOptions]:
-        options = IndexOptions()
         if unique:
-            if not isinstance(index, IndexSpec):
-                index = IndexDirection.ASCENDING
-            options["unique"] = True
+            return IndexDirection.ASCENDING if type(index) is not IndexDirection else index, _UNIQUE_INDEX_OPTIONS
+        if type(index) is IndexDirection:
+            return index, _DEFAULT_INDEX_OPTIONS
+        if index:
+            return IndexDirection.ASCENDING, _DEFAULT_INDEX_OPTIONS
+        return None, _DEFAULT_INDEX_OPTIONS
+
+    def __set_name__(self, owner: Type[object], name: str) -> None:
+        self.set_name(name)
 
-        if not isinstance(index, IndexDirection):
-            if index:
-                index = IndexDirection.ASCENDING
+    def set_name(self, name: str) -> None:
+        # the name keys the instance __dict__ lookups, same as the interned _fields keys
+        self.name = sys.intern(name)
+        self._checks = tuple(self._build_checks())
+
+    def _build_checks(self) -> list[Check]:
+        """
+        Returns the checks enabled by the field options, in order of execution.
+        Subclasses extend the list with their own checks
+        """
+        name = self.name
+        checks: list[Check] = []
+
+        if self.required:
+            required_message = f"field {name} is required"
+
+            def check_required(value: Any) -> None:
+                if value is None:
+                    raise ValidationError(required_message)
+            checks.append(check_required)
+
+        if self.__explicit_type_tuple__:
+            explicit_types = self.__explicit_type_tuple__
+            exact_types = self.__explicit_type_frozenset__
+            types_message = f"field {name} must be any of {[x.__name__ for x in explicit_types]}"
+
+            if self.strict:
+                def check_types(value: Any) -> None:
+                    if value is not None and type(value) not in exact_types:
+                        raise ValidationError(types_message)
             else:
-                index = None
+                def check_types(value: Any) -> None:
+                    # exact type match is the common case, isinstance handles subclasses
+                    if value is not None and type(value) not in exact_types and not isinstance(value, explicit_types):
+                        raise ValidationError(types_message)
+            checks.append(check_types)
+
+        if self.choices:
+            choices = self.choices
+            choices_message = f"field {name} must be one of {{{', '.join(map(repr, choices))}}}"
+
+            def check_choices(value: Any) -> None:
+                # the value can be None at this point only if it's not required
+                # thus, if it's not required, it's ok to be None even if choices are defined
+                if value is not None and value not in choices:
+                    raise ValidationError(choices_message)
+            checks.append(check_choices)
 
-        return index, options
+        return checks
 
-    def set_name(self, name: str) -> None:
-        self.name = name
+    def validate_sync(self, obj: object) -> None:
+        value = obj.__dict__.get(self.name)
+        for check in self._checks:
+            check(value)
 
     async def validate(self, obj: object) -> None:
-        value = self.__get__(obj)
-        if self.required and value is None:
-            raise ValidationError(f"field {self.name} is required")
-
-        if value is not None and self.__explicit_types__:
-            if not any([isinstance(value, _type) for _type in self.__explicit_types__]):
-                type_names = [x.__name__ for x in self.__explicit_types__]
-                raise ValidationError(f"field {self.name} must be any of {type_names}")
-
-        if self.choices and value not in self.choices:
-            if value is None:
-                # at this point the value can be None only if it's not required
-                # thus, if it's not required, it's ok to be None even if choices are defined
-                return
-
-            raise ValidationError(f"field {self.name} must be one of {self.choices}")
+        """
+        Subclasses may override this method to add checks that require
+        awaiting, e.g. fetching a referenced object from the database.
+        Models having such fields can't be validated with validate_sync only
+        """
+        self.validate_sync(obj)
 
 
 class ObjectIdField(Field[ObjectId]):
-    pass
+    __slots__ = ()
 
 
 class ReferenceField(ObjectIdField, Generic[TModel]):
 
+    __slots__ = ("on_destroy", "_reference_model")
+
     on_destroy: OnDestroy
 
     _reference_model: Type[TModel]
@@ -187,7 +310,7 @@ class ReferenceField(ObjectIdField, Generic[TModel]):
 
     async def validate(self, obj: object) -> None:
         await super().validate(obj)
-        value = self.__get__(obj)
+        value = obj.__dict__.get(self.name)
         if value is None:
             return
         ref = await self._reference_model.get(value)
@@ -199,6 +322,8 @@ class ReferenceField(ObjectIdField, Generic[TModel]):
 
 class SelfReferenceField(ReferenceField):
 
+    __slots__ = ()
+
     def register_ref(self, owner: Type[object], name: str) -> None:
         if not inspect.isabstract(owner) and ABC not in owner.__bases__:
             self._reference_model = owner
@@ -231,12 +356,65 @@ class SelfReferenceField(ReferenceField):
         self.on_destroy = on_destroy
 
 
+@functools.lru_cache(maxsize=None)
+def _compile(pattern: str) -> re.Pattern[str]:
+    # fields sharing the same pattern share the compiled object as well
+    return re.compile(pattern)
+
+
+def _ascii_digits(value: str) -> bool:
+    return value.isascii() and value.isdecimal()
+
+
+def _ascii_letters(value: str) -> bool:
+    return value.isascii() and value.isalpha()
+
+
+def _ascii_alnum(value: str) -> bool:
+    return value.isascii() and value.isalnum()
+
+
+# patterns matching a whole string of a single character class, which
+# str methods check without going through the regex engine
+_CLASS_PREDICATES: dict[str, Callable[[str], bool]] = {
+    r"\d+": str.isdecimal,
+    r"[0-9]+": _ascii_digits,
+    r"[a-zA-Z]+": _ascii_letters,
+    r"[A-Za-z]+": _ascii_letters,
+    r"[a-zA-Z0-9]+": _ascii_alnum,
+    r"[A-Za-z0-9]+": _ascii_alnum,
+}
+
+
+def _simple_matcher(pattern: str, fullmatch: bool) -> Callable[[str], bool] | None:
+    """
+    Returns a str predicate equivalent to matching the pattern,
+    None if the pattern is not one of the known simple ones
+    """
+    if not pattern.endswith("$"):
+        return None
+    # re.match is anchored at the beginning anyway
+    body = pattern[1:-1] if pattern.startswith("^") else pattern[:-1]
+    predicate = _CLASS_PREDICATES.get(body)
+    if predicate is None or fullmatch:
+        return predicate
+
+    def match(value: str) -> bool:
+        # unlike fullmatch, re.match allows "$" to match right before a trailing newline
+        return predicate(value) or (value[-1:] == "\n" and predicate(value[:-1]))
+    return match
+
+
 class StringField(Field[str]):
 
+    __slots__ = ("min_length", "max_length", "re_match", "re_fullmatch", "auto_trim", "_matcher")
+
     min_length: int | None
     max_length: int | None
     re_match: re.Pattern[str] | None
+    re_fullmatch: bool
     auto_trim: bool
+    _matcher: Callable[[str], Any] | None
 
     __explicit_types__ = [str]
 
@@ -246,6 +424,7 @@ class StringField(Field[str]):
         min_length: int | None = None,
         max_length: int | None = None,
         re_match: str | None = None,
+        re_fullmatch: bool = False,
         auto_trim: bool = True,
         required: bool = False,
         rejected: bool = False,
@@ -268,41 +447,60 @@ class StringField(Field[str]):
         self.auto_trim = auto_trim
         self.min_length = min_length
         self.max_length = max_length
+        self.re_fullmatch = re_fullmatch
         if re_match:
-            self.re_match = re.compile(re_match)
+            self.re_match = _compile(re_match)
+            # re_fullmatch=True requires the whole value to match, not only its beginning
+            self._matcher = (
+                _simple_matcher(re_match, re_fullmatch)
+                or (self.re_match.fullmatch if re_fullmatch else self.re_match.match)
+            )
         else:
             self.re_match = None
+            self._matcher = None
 
     def __set__(self, obj: object, value: str | None) -> None:
         # user can accidentally put something other than string to a string field
         # we must allow him to do that and only complain at validation
-        # thus the hasattr check
-        if hasattr(value, "strip") and self.auto_trim:
+        # thus the hasattr check. str.strip() returns the string itself when
+        # there is nothing to trim, so no extra whitespace checks are needed
+        if self.auto_trim and hasattr(value, "strip"):
             value = value.strip()
-        return super().__set__(obj, value)
+        obj.__dict__[self.name] = value
+
+    def _build_checks(self) -> list[Check]:
+        checks = super()._build_checks()
+        name = self.name
 
-    async def validate(self, obj: object) -> None:
-        await super().validate(obj)
-        value = self.__get__(obj)
-        if value is None:
-            return
         min_length = self.min_length
-        if min_length is not None and len(value) < min_length:
-            raise ValidationError(
-                f"field {self.name} must be at least {self.min_length} characters long"
-            )
+        if min_length is not None:
+            min_length_message = f"field {name} must be at least {min_length} characters long"
+
+            def check_min_length(value: str | None) -> None:
+                if value is not None and len(value) < min_length:
+                    raise ValidationError(min_length_message)
+            checks.append(check_min_length)
 
         max_length = self.max_length
-        if max_length is not None and len(value) > max_length:
-            raise ValidationError(
-                f"field {self.name} must be at most {self.max_length} characters long"
-            )
+        if max_length is not None:
+            max_length_message = f"field {name} must be at most {max_length} characters long"
+
+            def check_max_length(value: str | None) -> None:
+                if value is not None and len(value) > max_length:
+                    raise ValidationError(max_length_message)
+            checks.append(check_max_length)
 
         re_match = self.re_match
-        if re_match is not None and not re_match.match(value):
-            raise ValidationError(
-                f'field {self.name} must match pattern "{re_match.pattern}"'
-            )
+        if re_match is not None:
+            match = self._matcher
+            re_match_message = f'field {name} must match pattern "{re_match.pattern}"'
+
+            def check_re_match(value: str | None) -> None:
+                if value is not None and not match(value):
+                    raise ValidationError(re_match_message)
+            checks.append(check_re_match)
+
+        return checks
 
 
 TNumber = TypeVar("TNumber", bound=Real)
@@ -310,6 +508,8 @@ TNumber = TypeVar("TNumber", bound=Real)
 
 class NumberField(Field[TNumber]):
 
+    __slots__ = ("min_value", "max_value")
+
     min_value: TNumber | None
     max_value: TNumber | None
 
@@ -327,6 +527,7 @@ class NumberField(Field[TNumber]):
         index: IndexInput | None = None,
         unique: bool = False,
         choices: Iterable[TNumber] | None = None,
+        strict: bool | None = None,
     ) -> None:
         super().__init__(
             required=required,
@@ -336,33 +537,52 @@ class NumberField(Field[TNumber]):
             index=index,
             unique=unique,
             choices=choices,
+            strict=strict,
         )
         self.min_value = min_value
         self.max_value = max_value
 
-    async def validate(self, obj: object) -> None:
-        await super().validate(obj)
-        value = self.__get__(obj)
-        if value is None:
-            return
+    def _build_checks(self) -> list[Check]:
+        checks = super()._build_checks()
+        name = self.name
+
         min_value = self.min_value
+        if min_value is not None:
+            min_value_message = f"field {name} must be >= {min_value}"
+
+            def check_min_value(value: TNumber | None) -> None:
+                if value is not None and value < min_value:
+                    raise ValidationError(min_value_message)
+            checks.append(check_min_value)
+
         max_value = self.max_value
-        if min_value is not None and value < min_value:
-            raise ValidationError(f"field {self.name} must be >= {min_value}")
-        if max_value is not None and value > max_value:
-            raise ValidationError(f"field {self.name} must be <= {max_value}")
+        if max_value is not None:
+            max_value_message = f"field {name} must be <= {max_value}"
+
+            def check_max_value(value: TNumber | None) -> None:
+                if value is not None and value > max_value:
+                    raise ValidationError(max_value_message)
+            checks.append(check_max_value)
+
+        return checks
 
 
 class IntField(NumberField[int]):
+    __slots__ = ()
     __explicit_types__ = [int]
+    __strict_types__ = True
 
 
 class FloatField(NumberField[float]):
+    __slots__ = ()
     __explicit_types__ = [float]
+    __strict_types__ = True
 
 
 class ListField(Generic[T], Field[list[T]]):
 
+    __slots__ = ("min_length", "max_length")
+
     min_length: int | None
 
     __explicit_types__ = [list, set, tuple]
@@ -393,25 +613,33 @@ class ListField(Generic[T], Field[list[T]]):
         self.min_length = min_length
         self.max_length = max_length
 
-    async def validate(self, obj: object) -> None:
-        await super().validate(obj)
-        value = self.__get__(obj)
-        if value is None:
-            return
+    def _build_checks(self) -> list[Check]:
+        checks = super()._build_checks()
+        name = self.name
+
         min_length = self.min_length
+        if min_length is not None:
+            min_length_message = f"field {name} must be at least {min_length} items long"
+
+            def check_min_length(value: list[T] | None) -> None:
+                if value is not None and len(value) < min_length:
+                    raise ValidationError(min_length_message)
+            checks.append(check_min_length)
+
         max_length = self.max_length
-        if min_length is not None and len(value) < min_length:
-            raise ValidationError(
-                f"field {self.name} must be at least {min_length} items long"
-            )
+        if max_length is not None:
+            max_length_message = f"field {name} must be at most {max_length} items long"
 
-        if max_length is not None and len(value) > max_length:
-            raise ValidationError(
-                f"field {self.name} must be at most {self.max_length} items long"
-            )
+            def check_max_length(value: list[T] | None) -> None:
+                if value is not None and len(value) > max_length:
+                    raise ValidationError(max_length_message)
+            checks.append(check_max_length)
+
+        return checks
 
 
 class DatetimeField(Field[datetime]):
+    __slots__ = ()
     __explicit_types__ = [datetime]
 
 
@@ -421,6 +649,8 @@ V = TypeVar("V")
 
 class DictField(Field[dict[K, V]]):
 
+    __slots__ = ()
+
     __explicit_types__ = [dict]
 
     def __init__(
@@ -443,9 +673,11 @@ class DictField(Field[dict[K, V]]):
 
 
 class BoolField(Field[bool]):
+    __slots__ = ()
     __explicit_types__ = [bool]
+    __strict_types__ = True
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class ComputedField:
     is_async: bool
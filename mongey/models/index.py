@@ -1,6 +1,6 @@
 import enum
 import pymongo.collation
-from typing import Iterable, NamedTuple, Type, TypeVar, TypedDict
+from typing import Any, Hashable, Iterable, Mapping, NamedTuple, Type, TypeVar, TypedDict
 
 
 class IndexDirection(int, enum.Enum):
@@ -55,6 +55,23 @@ class _Index(NamedTuple):
 TIndex = TypeVar("TIndex", bound=_Index)
 
 
+def _freeze(value: Any) -> Hashable:
+    """
+    Hashable equivalent of an index option value, options like
+    partialFilterExpression or weights are nested dicts and lists
+    """
+    if isinstance(value, Mapping):
+        return frozenset((key, _freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, set):
+        return frozenset(_freeze(item) for item in value)
+    if isinstance(value, Hashable):
+        return value
+    # e.g. objects defining __eq__ without __hash__, equal ones must share the hash
+    return type(value)
+
+
 # This is to apply default value generator, impossible directly in NamedTuple
 class Index(_Index):
     def __new__(
@@ -65,3 +82,7 @@ class Index(_Index):
         if options is None:
             options = IndexOptions()
         return super().__new__(cls, keys, options)
+
+    def __hash__(self) -> int:
+        # keys and options are usually a list and a dict, so they are hashed by contents
+        return hash((tuple(self.keys), _freeze(self.options)))
@@ -1,34 +1,161 @@
-import inspect
-from typing import Optional, Sequence
-from .fields import Field, FieldProto, ComputedField
+import re
+import sys
+import string
+import functools
+from types import MappingProxyType
+from typing import Any, Callable, Mapping, Optional, Sequence, NamedTuple
+from .fields import Field, FieldProto, ComputedField, StringField
 from .index import Index, IndexKey, IndexDirection
-from .reference import ModelReference
+from .reference import ModelReference, OnDestroy
 
 
+# an underscore goes before every ASCII capital letter except the leading one
+_SNAKE_RE = re.compile(r"(?<!^)([A-Z])")
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+@functools.lru_cache(maxsize=1024)
 def snake_case(name: str) -> str:
-    result = ""
-    for i, l in enumerate(name):
-        if 65 <= ord(l) <= 90:
-            if i != 0:
-                result += "_"
-            result += l.lower()
+    return _SNAKE_RE.sub(r"_\1", name).translate(_ASCII_LOWER)
+
+
+_undef = object()
+
+
+class _ModelInfo(NamedTuple):
+    fields: Mapping[str, FieldProto]
+    indexes: tuple[Index, ...]
+    cache_key_fields: frozenset[str]
+    cached_methods: frozenset[str]
+
+
+class RefBuckets(NamedTuple):
+    raise_refs: tuple[ModelReference, ...]
+    cascade_refs: tuple[ModelReference, ...]
+    detach_refs: tuple[ModelReference, ...]
+
+
+def compile_init_fields(fields: Mapping[str, FieldProto]) -> Callable[[Any, dict[str, Any]], None]:
+    """
+    Generates a function setting the model fields from attrs (or field defaults)
+    with every field name and default value hardcoded, so that model
+    instantiation doesn't have to loop over the fields and inspect them
+    """
+    namespace: dict[str, Any] = {"_undef": _undef}
+    lines = [
+        "def _init_fields(self, attrs):",
+        "    d = self.__dict__",
+    ]
+    for i, (name, descriptor) in enumerate(fields.items()):
+        field_var = f"_field_{i}"
+        default_var = f"_default_{i}"
+        namespace[field_var] = descriptor
+        key = "_id" if name == "id" else name
+        lines.append(f"    v = attrs.get({key!r}, _undef)")
+
+        custom_default = type(descriptor).set_default is not Field.set_default
+        if custom_default:
+            lines.append("    if v is _undef:")
+            lines.append(f"        {field_var}.set_default(self)")
+            lines.append("    else:")
+            indent = "        "
+        else:
+            def_value = descriptor.def_value
+            namespace[default_var] = def_value
+            if callable(def_value):
+                lines.append(f"    if v is _undef: v = {default_var}()")
+            else:
+                lines.append(f"    if v is _undef: v = {default_var}")
+            indent = "    "
+
+        field_set = getattr(type(descriptor), "__set__", None)
+        if field_set is StringField.__set__:
+            # StringField.__set__ inlined, auto_trim is known at this point
+            if descriptor.auto_trim:
+                lines.append(f"{indent}if hasattr(v, 'strip'): v = v.strip()")
+            lines.append(f"{indent}d[{name!r}] = v")
+        elif field_set is not None:
+            # the field transforms values on assignment
+            lines.append(f"{indent}{field_var}.__set__(self, v)")
         else:
-            result += l
-    return result
+            lines.append(f"{indent}d[{name!r}] = v")
+
+    if not fields:
+        lines.append("    pass")
+
+    exec("\n".join(lines), namespace)
+    return namespace["_init_fields"]
+
+
+def compile_validate_fields(fields: Mapping[str, FieldProto]) -> Callable[[Any], None]:
+    """
+    Generates a function running the sync checks of all the fields one after
+    another. Checks of the fields relying on the default validate_sync are
+    called directly, the others get their validate_sync called
+    """
+    namespace: dict[str, Any] = {}
+    lines = [
+        "def _validate_fields(self):",
+        "    d = self.__dict__",
+    ]
+    for i, (name, descriptor) in enumerate(fields.items()):
+        if type(descriptor).validate_sync is not Field.validate_sync:
+            field_var = f"_field_{i}"
+            namespace[field_var] = descriptor
+            lines.append(f"    {field_var}.validate_sync(self)")
+            continue
+        checks = descriptor._checks
+        if not checks:
+            continue
+        lines.append(f"    v = d.get({name!r})")
+        for j, check in enumerate(checks):
+            check_var = f"_check_{i}_{j}"
+            namespace[check_var] = check
+            lines.append(f"    {check_var}(v)")
+
+    if len(lines) == 2:
+        lines.append("    pass")
+
+    exec("\n".join(lines), namespace)
+    return namespace["_validate_fields"]
 
 
 class MetaModel:
 
-    _fields: dict[str, FieldProto]
-    # every write to computed_fields is preceded by copying, so it's
-    # all right to have a mutable initializer here
-    computed_fields: dict[str, ComputedField] = {}
-    _cached_methods: set[str] = None
-    _indexes: Sequence[Index]
-    _cache_key_fields: set[str]
+    # read-only, computed once per class and shared by all its instances
+    _fields: Mapping[str, FieldProto]
+    # precomputed views of _fields for the hot paths iterating over them
+    _field_names: tuple[str, ...]
+    _field_items: tuple[tuple[str, FieldProto], ...]
+    _public_field_names: tuple[str, ...]
+    # to_dict() field selections by call signature, filled by BaseModel._to_dict_plan
+    _to_dict_plans: dict[tuple[tuple[str, ...], bool, bool], tuple[tuple[str, str], ...]]
+    # public fields followed by the computed ones, see BaseModel.exposed_fields
+    _exposed_field_names: tuple[str, ...]
+    # fields which can be set via StorableModel.update
+    _updatable_fields: frozenset[str]
+    _init_fields: Callable[[Any, dict[str, Any]], None]
+    # runs the sync checks of all the fields, generated by compile_validate_fields
+    _validate_fields: Callable[[Any], None]
+    # name -> (restricted, computed field or None for regular fields), used by to_dict_ext
+    _serializable: dict[str, tuple[bool, ComputedField | None]]
+    # True if any of the fields has checks to be awaited, i.e. overrides Field.validate
+    _has_async_fields: bool
+    # every class gets its own read-only computed_fields in __init_subclass__,
+    # merged with the parents' ones once at class creation time
+    computed_fields: Mapping[str, ComputedField] = MappingProxyType({})
+    _cached_methods: frozenset[str] = frozenset()
+    _indexes: tuple[Index, ...]
+    _cache_key_fields: frozenset[str]
+    # _fields, _indexes, _cache_key_fields and _cached_methods collected in a single MRO walk
+    __model_info__: _ModelInfo
     _references: set[ModelReference] = None
+    # references grouped by on_destroy policy, built lazily by _bucket_refs
+    _ref_buckets: Optional[RefBuckets] = None
 
     collection: str
+    # common prefix of the model cache keys, i.e. "<collection>."
+    _cache_key_prefix: str
 
     # You will usually need INDEXES only for defining compound ones, as
     # simple single-field indexes including "unique" have a shortcut arg
@@ -43,10 +170,27 @@ class MetaModel:
     CACHE_KEY_FIELDS: Optional[Sequence[str]] = None
 
     def __init_subclass__(cls) -> None:
-        cls._fields = {
-            name: obj
-            for name, obj in inspect.getmembers(cls)
-            if isinstance(obj, Field)
+        info = cls.__model_info__ = cls.__collect_model_info()
+        cls._fields = info.fields
+        cls._indexes = info.indexes
+        cls._cache_key_fields = info.cache_key_fields
+        cls._cached_methods = info.cached_methods
+        cls._field_names = tuple(cls._fields)
+        cls._field_items = tuple(cls._fields.items())
+        cls._public_field_names = tuple(name for name, field in cls._field_items if not field.restricted)
+        cls._to_dict_plans = {}
+        cls._updatable_fields = frozenset(
+            name for name, field in cls._field_items if not field.rejected and name != "_id"
+        )
+        cls._init_fields = compile_init_fields(cls._fields)
+        cls._validate_fields = compile_validate_fields(cls._fields)
+        cls._has_async_fields = any(type(field).validate is not Field.validate for field in cls._fields.values())
+        cls.computed_fields = cls.__get_computed_fields()
+        cls._exposed_field_names = cls._public_field_names + tuple(cls.computed_fields)
+        # regular fields take precedence over computed ones with the same name
+        cls._serializable = {
+            **{name: (False, computed) for name, computed in cls.computed_fields.items()},
+            **{name: (field.restricted, None) for name, field in cls._field_items},
         }
 
         for field_name, field in cls._fields.items():
@@ -54,60 +198,122 @@ class MetaModel:
             if hasattr(field, "register_ref"):
                 field.register_ref(cls, field_name)
 
-        cls._indexes = cls.__get_indexes()
-        cls._cache_key_fields = cls.__get_cache_key_fields()
-
-        if not cls._cached_methods:
-            cls._cached_methods = set()
-
         if not cls._references:
             cls._references = set()
 
         cls.collection = cls.COLLECTION if cls.COLLECTION else snake_case(cls.__name__)  # TODO: Remove one of the two
+        cls._cache_key_prefix = cls.collection + "."
 
     @classmethod
     def add_ref(cls, ref: ModelReference):
         cls._references.add(ref)
+        cls._ref_buckets = None
+
+    @classmethod
+    def _bucket_refs(cls) -> RefBuckets:
+        """
+        Returns the class references grouped by their on_destroy policy.
+        References are registered by the referencing classes, which may be
+        defined later than this one, hence the buckets are built on first use
+        """
+        buckets = cls._ref_buckets
+        # subclasses may share the references set with their parent, so
+        # the memoized buckets are only trusted if they cover all the refs
+        if buckets is None or sum(map(len, buckets)) != len(cls._references):
+            by_policy: dict[OnDestroy, list[ModelReference]] = {policy: [] for policy in OnDestroy}
+            for ref in cls._references:
+                by_policy[ref.on_destroy].append(ref)
+            buckets = cls._ref_buckets = RefBuckets(
+                raise_refs=tuple(by_policy[OnDestroy.RAISE]),
+                cascade_refs=tuple(by_policy[OnDestroy.CASCADE]),
+                detach_refs=tuple(by_policy[OnDestroy.DETACH]),
+            )
+        return buckets
 
     @classmethod
-    def __get_indexes(cls) -> Sequence[Index]:
+    def __collect_model_info(cls) -> _ModelInfo:
+        fields: dict[str, FieldProto] = {}
+        cache_key_fields: set[str] = set()
+        cached_methods: set[str] = set()
+        base_indexes: list[Sequence[Index]] = []
+
+        # the bases are walked from object down to cls, so the attributes
+        # closer to cls override the others, the same way getattr resolves
+        # them. Fields keep the position of their first definition, i.e.
+        # the inherited fields go first in the order they are declared
+        for base in reversed(cls.__mro__):
+            for name, obj in vars(base).items():
+                if getattr(type(obj), "__is_mongey_field__", False):
+                    # field names key every attrs/__dict__ lookup, interned keys
+                    # make those lookups an identity check in the common case
+                    fields[sys.intern(name)] = obj
+                    cached_methods.discard(name)
+                elif getattr(obj, "__model_cached_method__", False):
+                    cached_methods.add(name)
+                    fields.pop(name, None)
+                else:
+                    fields.pop(name, None)
+                    cached_methods.discard(name)
+
+            if not issubclass(base, MetaModel):
+                continue
+
+            key_field = base.KEY_FIELD
+            # _id field renaming. cache operates model props, not mongodb fields
+            if key_field == "_id":
+                key_field = "id"
+            cache_key_fields.add(key_field)
+            if base.CACHE_KEY_FIELDS:
+                cache_key_fields.update(map(sys.intern, base.CACHE_KEY_FIELDS))
+            if base.INDEXES:
+                base_indexes.append(base.INDEXES)
+
+        indexes: list[Index] = []
         if cls.KEY_FIELD != "id":
-            yield Index(
+            indexes.append(Index(
                 keys=[
                     IndexKey(key=cls.KEY_FIELD, spec=IndexDirection.ASCENDING)
                 ],
                 options={"unique": True}
-            )
+            ))
 
-        for field, descriptor in cls._fields.items():
+        for field, descriptor in fields.items():
             if descriptor.index is None:
                 continue
-            yield Index(
+            indexes.append(Index(
                 keys=[IndexKey(key=field, spec=descriptor.index)],
                 options=descriptor.index_options,
-            )
+            ))
 
-        seen = set()
-        for base in reversed(inspect.getmro(cls)):
-            if not issubclass(base, MetaModel):
-                continue
-            if id(base.INDEXES) not in seen and base.INDEXES:
-                seen.add(id(base.INDEXES))
-                yield from base.INDEXES
+        # INDEXES are inherited, so the same sequence may be found on several bases
+        seen_indexes = set()
+        for base_index_list in base_indexes:
+            if id(base_index_list) not in seen_indexes:
+                seen_indexes.add(id(base_index_list))
+                indexes.extend(base_index_list)
 
-    @classmethod
-    def __get_cache_key_fields(cls) -> set[str]:
-        cache_fields = set()
-        for base in inspect.getmro(cls):
-            if not issubclass(base, MetaModel):
-                continue
+        indexes = tuple(indexes)
+        # subclasses adding no indexes share the parent tuple, so a
+        # parent's indexes can be recognized with a cheap identity check
+        for base in cls.__bases__:
+            if base is not MetaModel and issubclass(base, MetaModel) and base._indexes == indexes:
+                indexes = base._indexes
+                break
 
-            key_field = base.KEY_FIELD
+        return _ModelInfo(
+            fields=MappingProxyType(fields),
+            indexes=indexes,
+            cache_key_fields=frozenset(cache_key_fields),
+            cached_methods=frozenset(cached_methods),
+        )
 
-            # _id field renaming. cache operates model props, not mongodb fields
-            if key_field == "_id":
-                key_field = "id"
-            cache_fields.add(key_field)
-            if base.CACHE_KEY_FIELDS:
-                cache_fields.update(base.CACHE_KEY_FIELDS)
-        return cache_fields
+    @classmethod
+    def __get_computed_fields(cls) -> Mapping[str, ComputedField]:
+        # parents' computed_fields are already merged with their ancestors' ones,
+        # so only the direct bases and the class' own api fields are looked at
+        computed_fields: dict[str, ComputedField] = {}
+        for base in reversed(cls.__bases__):
+            computed_fields.update(getattr(base, "computed_fields", {}))
+        # api_field.__set_name__ puts the class' own api fields to its __dict__
+        computed_fields.update(cls.__dict__.get("computed_fields", {}))
+        return MappingProxyType(computed_fields)
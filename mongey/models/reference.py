@@ -12,11 +12,16 @@ class OnDestroy(Enum):
     DETACH = "detach"
 
 
-@dataclass
+@dataclass(eq=False, frozen=True, slots=True)
 class ModelReference:
     ref_class: Type["TBaseModel"]
     ref_field: str
     on_destroy: OnDestroy
 
     def __hash__(self):
-        return hash(f"{self.ref_class.__name__}.{self.ref_field}")
+        return hash((self.ref_class, self.ref_field))
+
+    def __eq__(self, other):
+        if not isinstance(other, ModelReference):
+            return NotImplemented
+        return self.ref_class is other.ref_class and self.ref_field == other.ref_field
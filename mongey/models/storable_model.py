@@ -1,21 +1,28 @@
+import asyncio
+import functools
 from typing import Coroutine, Dict, Any, Tuple, Optional, Type, List, Callable
-from functools import partial
 from time import time
+from logging import DEBUG
 from motor.motor_asyncio import AsyncIOMotorCursor
 from bson.objectid import ObjectId
 from .base_model import BaseModel, TPydanticModel
 from ..db import ObjectsCursor, Shard
 from ..errors import ModelDestroyed
 from ..util import resolve_id
-from ..decorators import save_required
+from ..decorators import save_required, CACHED_VALUES_ATTR
 from ..context import ctx
 from ..types import TModel
 
+# returned by cache engines for missing keys, unlike None it can't be a cached value
+_MISS = object()
+
 
 class StorableModel(BaseModel):
 
-    @staticmethod
-    def _db() -> Shard:
+    @classmethod
+    @functools.cache
+    def _db(cls) -> Shard:
+        # resolved once per model class, DB.configure resets the cache
         return ctx.db.meta
 
     async def _save_to_db(self) -> None:
@@ -26,13 +33,9 @@ class StorableModel(BaseModel):
                      *,
                      skip_callback: bool = False,
                      invalidate_cache: bool = True) -> TModel:
-        for field, descriptor in self._fields.items():
-            if (
-                field in data
-                and not descriptor.rejected
-                and field != "_id"
-            ):
-                self.__dict__[field] = data[field]
+        # data usually carries a few keys, so the loop runs over data, not the fields
+        updatable = self._updatable_fields
+        self.__dict__.update((field, value) for field, value in data.items() if field in updatable)
         return await self.save(skip_callback=skip_callback, invalidate_cache=invalidate_cache)
 
     async def update_from_pydantic(self: TModel,
@@ -83,6 +86,7 @@ class StorableModel(BaseModel):
         tmp = await self._refetch_from_db()
         if tmp is None:
             raise ModelDestroyed("model has been deleted from db")
+        self.__dict__.pop(CACHED_VALUES_ATTR, None)
         self._reload_from_model(tmp)
 
     @classmethod
@@ -107,8 +111,10 @@ class StorableModel(BaseModel):
                   **kwargs: Dict[str, Any]) -> AsyncIOMotorCursor:
         if not query:
             query = {}
-        pipeline = [{"$match": cls._preprocess_query(query)}] + pipeline
-        return cls._db().get_aggregated(cls.collection, pipeline, **kwargs)
+        # the caller's pipeline is left untouched
+        full_pipeline = [{"$match": cls._preprocess_query(query)}]
+        full_pipeline.extend(pipeline)
+        return cls._db().get_aggregated(cls.collection, full_pipeline, **kwargs)
 
     @classmethod
     def find_projected(cls,
@@ -129,8 +135,9 @@ class StorableModel(BaseModel):
                        query: Optional[Dict[str, Any]] = None,
                        max_count: Optional[int] = None,
                        **kwargs: Dict[str, Any]) -> List[ObjectId]:
-        objs = await cls.find_projected(query, **kwargs).to_list(max_count)
-        return [obj["_id"] for obj in objs]
+        if not query:
+            query = {}
+        return await cls._db().get_ids(cls.collection, cls._preprocess_query(query), max_count, **kwargs)
 
     @classmethod
     async def find_one(cls: Type[TModel], query: Dict[str, Any], **kwargs: Dict[str, Any]) -> Optional[TModel]:
@@ -152,6 +159,9 @@ class StorableModel(BaseModel):
     def _resolve_get_query(cls, expression: str | ObjectId | None) -> Optional[Dict[str, Any]]:
         if expression is None:
             return None
+        # already typed ids are the most common case and need no resolving
+        if type(expression) is ObjectId:
+            return {"_id": expression}
 
         resolved_expr = resolve_id(expression)
         if isinstance(resolved_expr, ObjectId):
@@ -208,73 +218,121 @@ class StorableModel(BaseModel):
             if raise_if_none:
                 raise raise_if_none
             return None
-        cache_key = f"{cls.collection}.{expression}"
-        getter = partial(cls.get, expression, raise_if_none)
-        return await cls._cache_get(cache_key, getter)
+        cache_key = f"{cls._cache_key_prefix}{expression}"
+        # timings are only measured if they are going to be logged
+        t1 = time() if ctx.log.isEnabledFor(DEBUG) else None
+        obj = await cls._cache_lookup(cache_key)
+        if obj is _MISS:
+            obj = await cls.get(expression, raise_if_none)
+            await cls._cache_store(cache_key, obj, t1)
+        return obj
 
     @classmethod
     async def _cache_get(cls: Type[TModel],
                          cache_key: str,
-                         getter: partial[Coroutine[None, None, TModel | None]],
+                         getter: Callable[[], Coroutine[None, None, TModel | None]],
                          ctor: Optional[Callable[..., TModel]] = None) -> Optional[TModel]:
-        t1 = time()
+        t1 = time() if ctx.log.isEnabledFor(DEBUG) else None
+        obj = await cls._cache_lookup(cache_key, ctor)
+        if obj is _MISS:
+            obj = await getter()
+            await cls._cache_store(cache_key, obj, t1)
+        return obj
+
+    @classmethod
+    async def _cache_lookup(cls: Type[TModel],
+                            cache_key: str,
+                            ctor: Optional[Callable[..., TModel]] = None) -> TModel | object:
+        """
+        Looks the object up in L1 and then L2 cache, returns _MISS if
+        it's found in neither of them
+        """
+        log = ctx.log
+        debug = log.isEnabledFor(DEBUG)
+        if debug:
+            t1 = time()
         if not ctor:
             ctor = cls
 
-        if await ctx.l1_cache.has(cache_key):
-            data = await ctx.l1_cache.get(cache_key)
-            td = time() - t1
-            ctx.log.debug(
-                "%s L1 hit %s %.3f secs", ctx.l1_cache.__class__.__name__, cache_key, td
-            )
+        data = await ctx.l1_cache.get(cache_key, _MISS)
+        if data is not _MISS:
+            if debug:
+                td = time() - t1
+                log.debug(
+                    "%s L1 hit %s %.3f secs", ctx.l1_cache.__class__.__name__, cache_key, td
+                )
             return ctor(data)
 
-        if await ctx.l2_cache.has(cache_key):
-            data = await ctx.l2_cache.get(cache_key)
+        data = await ctx.l2_cache.get(cache_key, _MISS)
+        if data is not _MISS:
             await ctx.l1_cache.set(cache_key, data)
-            td = time() - t1
-            ctx.log.debug(
-                "%s L2 hit %s %.3f secs", ctx.l2_cache.NAME, cache_key, td
-            )
+            if debug:
+                td = time() - t1
+                log.debug(
+                    "%s L2 hit %s %.3f secs", ctx.l2_cache.NAME, cache_key, td
+                )
             return ctor(data)
 
-        obj: Optional[TModel] = await getter()
+        return _MISS
+
+    @staticmethod
+    async def _cache_store(cache_key: str, obj: Optional[TModel], t1: Optional[float]) -> None:
+        """
+        Stores the object fetched on cache miss, t1 is the lookup start time
+        or None if the timings are not logged
+        """
         if obj:
             data = obj.to_dict(include_restricted=True, convert_id=True)
             await ctx.l2_cache.set(cache_key, data)
             await ctx.l1_cache.set(cache_key, data)
 
-        td = time() - t1
-        ctx.log.debug("%s miss %s %.3f secs", ctx.l2_cache.NAME, cache_key, td)
-        return obj
+        if t1 is not None:
+            td = time() - t1
+            ctx.log.debug("%s miss %s %.3f secs", ctx.l2_cache.NAME, cache_key, td)
 
     async def invalidate(self, **kwargs: Dict[str, Any]) -> None:
+        self.__dict__.pop(CACHED_VALUES_ATTR, None)
+        prefix = self._cache_key_prefix
+        initial_state = self._initial_state
         for field in self._cache_key_fields:
-            value = self._initial_state.get(field)
+            value = initial_state.get(field)
             if value is not None:
-                cache_key = f"{self.collection}.{value}"
-                await self._invalidate(cache_key)
+                await self._invalidate(f"{prefix}{value}")
         if not self.is_new:
+            prefix = self._cache_key_id_prefix
             for method in self._cached_methods:
-                cache_key = f"{self.collection}.{self.id}.{method}"
-                await self._invalidate(cache_key)
+                await self._invalidate(prefix + method)
 
     @classmethod
     async def invalidate_many(cls, query: Dict[str, Any],):
-        models = await cls.find(query).all()
-        for model in models:
-            for field in cls._cache_key_fields:
-                value = getattr(model, field)
-                if value is not None:
-                    cache_key = f"{cls.collection}.{value}"
-                    await cls._invalidate(cache_key)
-            for method in cls._cached_methods:
-                cache_key = f"{cls.collection}.{model.id}.{method}"
-                await cls._invalidate(cache_key)
+        # only the fields making up the cache keys are fetched, and
+        # no model objects are constructed for the documents
+        doc_fields = ["_id" if field == "id" else field for field in cls._cache_key_fields]
+        projection = tuple({"_id", *doc_fields})
+        docs = await cls.find_projected(query, projection=projection).to_list(None)
+        prefix = cls._cache_key_prefix
+        # the keys are built column by column with comprehensions, which
+        # keeps bulk invalidation of thousands of documents cheap
+        cache_keys = {
+            f"{prefix}{value}"
+            for field in doc_fields
+            for value in [doc.get(field) for doc in docs]
+            if value is not None
+        }
+        if cls._cached_methods:
+            id_prefixes = [f"{prefix}{doc['_id']}." for doc in docs]
+            cache_keys.update(id_prefix + method for method in cls._cached_methods for id_prefix in id_prefixes)
+        if not cache_keys:
+            return
+        await asyncio.gather(ctx.l1_cache.delete_many(cache_keys), ctx.l2_cache.delete_many(cache_keys))
+        ctx.log.debug("%s, %s delete %d keys", ctx.l1_cache.NAME, ctx.l2_cache.NAME, len(cache_keys))
 
     @staticmethod
     async def _invalidate(cache_key: str) -> None:
-        if await ctx.l1_cache.delete(cache_key):
+        l1_deleted, l2_deleted = await asyncio.gather(
+            ctx.l1_cache.delete(cache_key), ctx.l2_cache.delete(cache_key)
+        )
+        if l1_deleted:
             ctx.log.debug("%s delete %s", ctx.l1_cache.NAME, cache_key)
-        if await ctx.l2_cache.delete(cache_key):
+        if l2_deleted:
             ctx.log.debug("%s delete %s", ctx.l2_cache.NAME, cache_key)
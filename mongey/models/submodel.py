@@ -8,6 +8,25 @@ TStorableSubmodel = TypeVar("TStorableSubmodel", bound="StorableSubmodel")
 TStorableSubmodelType = Type[TStorableSubmodel]
 
 
+def _make_loaders_ctor(loaders: Dict[str, TStorableSubmodelType]):
+    """
+    Makes a _ctor dispatching documents to the registered submodel loaders,
+    with the loaders dict bound to the closure instead of being looked up
+    on the class for every document loaded
+    """
+    def _ctor(cls: TStorableSubmodelType, attrs: dict[str, Any], **kwargs: Dict[str, Any]) -> "TStorableSubmodel":
+        try:
+            submodel_name = attrs["submodel"]
+        except KeyError:
+            raise MissingSubmodel(f"{cls.__name__} has no submodel in the DB. Bug?") from None
+        try:
+            loader = loaders[submodel_name]
+        except KeyError:
+            raise UnknownSubmodel(f"Submodel {submodel_name} is not registered with {cls.__name__}") from None
+        return loader(attrs, **kwargs)
+    return _ctor
+
+
 class StorableSubmodel(StorableModel):
     """
     - Make the base class first. Set COLLECTION explicitly - it is not
@@ -75,14 +94,17 @@ class StorableSubmodel(StorableModel):
             raise IntegrityError("Attempted to register submodel with another submodel")
         if not cls.__submodel_loaders__:
             cls.__submodel_loaders__ = {}
+            # the loaders dict is shared with the subclasses, so is the dispatching ctor
+            cls._ctor = classmethod(_make_loaders_ctor(cls.__submodel_loaders__))
         if name in cls.__submodel_loaders__:
             raise IntegrityError(f"Submodel {name} already registered")
         cls.__submodel_loaders__[name] = ctor
 
     @classmethod
     def _preprocess_query(cls, query: Dict[str, Any]) -> Dict[str, Any]:
+        # a new dict is returned, the caller's query is left intact and may be reused
         if cls.SUBMODEL:
-            query.update({"submodel": cls.SUBMODEL})
+            return {**query, "submodel": cls.SUBMODEL}
         return query
 
     @classmethod
@@ -3,3 +3,4 @@ from .test_storable_model import TestStorableModel
 from .test_submodel import TestSubmodel
 from .test_validators import TestValidators
 from .test_reference import TestReference
+from .test_cache import TestCache
@@ -1,10 +1,17 @@
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Type, TYPE_CHECKING
 from unittest import IsolatedAsyncioTestCase
+from bson import ObjectId
 from contextvars import ContextVar, Token
+from mongomock_motor import AsyncMongoMockDatabase
 from ..context import ctx
 from ..config import DatabaseConfig
 from ..cache import TraceCache, RequestLocalCache
+from ..types import TModel
+from ..errors import ModelDestroyed
+from ..decorators import CACHED_VALUES_ATTR
+if TYPE_CHECKING:
+    from ..models.storable_model import StorableModel
 
 
 custom_cache_ctxvar: ContextVar[Optional[Dict[str, Any]]] = ContextVar("request_cache_test", default=None)
@@ -13,6 +20,9 @@ custom_cache_ctxvar: ContextVar[Optional[Dict[str, Any]]] = ContextVar("request_
 class MongoMockTest(IsolatedAsyncioTestCase):
 
     token: Optional[Token[Dict[str, Any]]] = None
+    # bound once in setUpClass so that tests don't go through ctx every time
+    trace_cache: TraceCache
+    dbconn: AsyncMongoMockDatabase
 
     @classmethod
     def setUpClass(cls) -> None:
@@ -39,8 +49,9 @@ class MongoMockTest(IsolatedAsyncioTestCase):
         # L2 Cache resets after each test rather than after each request
         #
         # TraceCache does not store any data but is able to track its methods calls
-        ctx._l1_cache = TraceCache()
+        ctx._l1_cache = cls.trace_cache = TraceCache()
         ctx._l2_cache = RequestLocalCache(custom_cache_ctxvar)
+        cls.dbconn = ctx.db.meta.conn
 
     async def asyncSetUp(self) -> None:
         self.token = custom_cache_ctxvar.set({})
@@ -49,3 +60,43 @@ class MongoMockTest(IsolatedAsyncioTestCase):
         custom_cache_ctxvar.reset(self.token)
         self.token = None
 
+    @staticmethod
+    async def _fast_truncate(model: Type["StorableModel"]) -> None:
+        """
+        Drops the model collection instead of deleting the documents one
+        by one via destroy_all, there are no model callbacks to run in tests
+        """
+        await model._db().conn[model.collection].drop()
+        ctx.l1_cache.reset()
+
+    @staticmethod
+    async def bulk_insert(model: Type[TModel], rows: List[Dict[str, Any]]) -> List[TModel]:
+        """
+        Inserts the rows with a single insert_many bypassing model validation
+        and callbacks, returns the models loaded from the inserted documents
+        """
+        submodel = getattr(model, "SUBMODEL", None)
+        docs = []
+        for row in rows:
+            doc = {"_id": ObjectId(), **row}
+            if submodel:
+                doc["submodel"] = submodel
+            docs.append(doc)
+        await model._db().conn[model.collection].insert_many(docs)
+        return [model(doc) for doc in docs]
+
+    @staticmethod
+    async def reload_many(model: Type[TModel], models: List[TModel]) -> None:
+        """
+        reload() for a number of models fetched with a single query,
+        no model is updated if any of them has been deleted from db
+        """
+        stored = [obj for obj in models if not obj.is_new]
+        if not stored:
+            return
+        fetched = await model.find({"_id": {"$in": [obj.id for obj in stored]}}).as_map()
+        if any(obj.id not in fetched for obj in stored):
+            raise ModelDestroyed("model has been deleted from db")
+        for obj in stored:
+            obj.__dict__.pop(CACHED_VALUES_ATTR, None)
+            obj._reload_from_model(fetched[obj.id])
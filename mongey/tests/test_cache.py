@@ -0,0 +1,155 @@
+import asyncio
+import pickle
+from datetime import datetime
+from unittest import IsolatedAsyncioTestCase
+import aiomcache
+from bson import ObjectId
+from ..cache import AbstractCache, SimpleCache, MemcachedCache, BatchingMemcachedCache, TraceCache
+
+
+class FakeMemcachedClient:
+
+    def __init__(self, data):
+        self.data = data
+        self.multi_get_calls = []
+
+    @staticmethod
+    def _validate(key):
+        if b" " in key:
+            raise aiomcache.ValidationException("invalid key", key)
+
+    async def get(self, key):
+        self._validate(key)
+        return self.data.get(key)
+
+    async def multi_get(self, *keys):
+        self.multi_get_calls.append(keys)
+        for key in keys:
+            self._validate(key)
+        return tuple(self.data.get(key) for key in keys)
+
+
+class TestCache(IsolatedAsyncioTestCase):
+
+    async def test_simple_cache_lru(self):
+        cache = SimpleCache(max_items=2)
+        await cache.set("a", 1)
+        await cache.set("b", 2)
+        self.assertEqual(await cache.get("a"), 1)
+
+        # "b" is the least recently used one now
+        await cache.set("c", 3)
+        self.assertFalse(await cache.has("b"))
+        self.assertEqual(await cache.get("a"), 1)
+        self.assertEqual(await cache.get("c"), 3)
+
+        await cache.delete("a")
+        await cache.delete("a")
+        self.assertIsNone(await cache.get("a"))
+        self.assertEqual(await cache.get("a", "default"), "default")
+        # cached None is a hit, not a miss
+        await cache.set("n", None)
+        self.assertIsNone(await cache.get("n", "default"))
+
+    async def test_batching_memcached_cache(self):
+        cache = BatchingMemcachedCache(["localhost"])
+        client = FakeMemcachedClient({b"a": pickle.dumps(1), b"b": pickle.dumps(2)})
+        cache._backends = [client]
+
+        values = await asyncio.gather(cache.get("a"), cache.get("b"), cache.get("c"), cache.get("a"))
+        self.assertEqual(values, [1, 2, None, 1])
+        self.assertEqual(client.multi_get_calls, [(b"a", b"b", b"c")])
+        self.assertEqual(await cache.get("c", "default"), "default")
+
+        # an invalid key doesn't turn the rest of the batch into misses
+        values = await asyncio.gather(cache.get("a"), cache.get("in valid"), cache.get("b"))
+        self.assertEqual(values, [1, None, 2])
+
+    async def test_batching_memcached_cache_flush_cancelled(self):
+        started = asyncio.Event()
+        gate = asyncio.Event()
+
+        class SlowClient(FakeMemcachedClient):
+            async def multi_get(self, *keys):
+                started.set()
+                await gate.wait()
+                return await super().multi_get(*keys)
+
+        cache = BatchingMemcachedCache(["localhost"])
+        client = SlowClient({b"a": pickle.dumps(1)})
+        cache._backends = [client]
+
+        getter = asyncio.ensure_future(cache.get("a"))
+        await started.wait()
+        flushes = [task for task in cache._tasks if task.get_coro().__name__ == "_resolve"]
+        self.assertEqual(len(flushes), 1)
+        flushes[0].cancel()
+
+        # the waiting get fails instead of hanging
+        with self.assertRaises(aiomcache.ClientException):
+            await asyncio.wait_for(getter, 1)
+
+        # the request itself is not cancelled and gets to read its reply
+        gate.set()
+        while cache._tasks:
+            await asyncio.sleep(0)
+        self.assertEqual(client.multi_get_calls, [(b"a",)])
+
+    async def test_memcached_marshal_serializer(self):
+        cache = MemcachedCache([], serializer="marshal")
+        for value in [{"a": [1, 2.5, None, True], "b": "c"}, {"_id": ObjectId(), "created_at": datetime.now()}]:
+            self.assertEqual(cache._loads(cache._dumps(value)), value)
+
+    async def test_trace_cache_snapshot(self):
+        tc = TraceCache()
+        await tc.get("a")
+        await tc.delete_many(["a", "b", "a"])
+
+        ops = tc.snapshot_ops()
+        self.assertEqual(tc.calls["delete"], [])
+        tc.assert_called(ops, "get", "a")
+        tc.assert_called(ops, "delete", "a", times=2)
+        with self.assertRaises(AssertionError):
+            # checked pairs are removed from the snapshot
+            tc.assert_called(ops, "delete", "a", times=2)
+        tc.assert_called(ops, "delete", "b")
+        self.assertEqual(ops, {})
+
+    async def test_custom_engine(self):
+        class Incomplete(AbstractCache):
+            pass
+
+        with self.assertRaises(TypeError):
+            Incomplete()
+
+        class LegacyCache(AbstractCache):
+            # an engine implementing the former get(key) signature
+            NAME = "LegacyCache"
+
+            def __init__(self):
+                self.d = {}
+
+            async def initialise(self):
+                return
+
+            async def get(self, key):
+                return self.d.get(key)
+
+            async def set(self, key, value):
+                self.d[key] = value
+
+            async def has(self, key):
+                return key in self.d
+
+            async def delete(self, key):
+                self.d.pop(key, None)
+
+        cache = LegacyCache()
+        await cache.set("a", 1)
+        self.assertEqual(await cache.get("a"), 1)
+        self.assertEqual(await cache.get("b", "default"), "default")
+
+        # delete_many falls back to deleting the keys one by one
+        await cache.set("b", 2)
+        await cache.delete_many(["a", "b"])
+        self.assertEqual(cache.d, {})
@@ -10,9 +10,8 @@ class TestReference(MongoMockTest):
 
     async def asyncSetUp(self) -> None:
         await super().asyncSetUp()
-        from mongey.context import ctx
-        await ctx.db.meta.conn.master.delete_many({})
-        await ctx.db.meta.conn.minion.delete_many({})
+        await self.dbconn.master.delete_many({})
+        await self.dbconn.minion.delete_many({})
 
     async def test_reference_field_raise(self):
         class Master(StorableModel):
@@ -73,11 +72,11 @@ class TestReference(MongoMockTest):
         class SubMinion(Minion):
             other_field = StringField()
 
-        self.assertCountEqual(
-            [
+        self.assertEqual(
+            {
                 ModelReference(ref_class=Minion, ref_field="master_id", on_destroy=OnDestroy.RAISE),
                 ModelReference(ref_class=SubMinion, ref_field="master_id", on_destroy=OnDestroy.RAISE)
-            ],
+            },
             Master._references
         )
 
@@ -94,8 +93,8 @@ class TestReference(MongoMockTest):
         class SubMinion(Minion):
             other_field = StringField()
 
-        self.assertCountEqual(
-            [ModelReference(ref_class=SubMinion, ref_field="master_id", on_destroy=OnDestroy.RAISE)],
+        self.assertEqual(
+            {ModelReference(ref_class=SubMinion, ref_field="master_id", on_destroy=OnDestroy.RAISE)},
             Master._references
         )
 
@@ -137,3 +136,25 @@ class TestReference(MongoMockTest):
 
         with self.assertRaises(ObjectHasReferences):
             await p.destroy()
+
+    async def test_raise_before_cascade(self):
+        class Master(StorableModel):
+            KEY_FIELD = "name"
+            name = StringField()
+
+        class Minion(StorableModel):
+            KEY_FIELD = "name"
+            name = StringField()
+            master_id: ReferenceField[Master] = ReferenceField(reference_model=Master, on_destroy=OnDestroy.CASCADE)
+            blocker_id: ReferenceField[Master] = ReferenceField(reference_model=Master, on_destroy=OnDestroy.RAISE)
+
+        m = Master.create(name="master")
+        await m.save()
+        mi1 = Minion.create(name="mi1", master_id=m.id, blocker_id=m.id)
+        await mi1.save()
+
+        with self.assertRaises(ObjectHasReferences) as cx:
+            await m.destroy()
+        self.assertEqual("Master has dangling references of types ['Minion']", cx.exception.detail)
+        # cascade must not run if the object can't be destroyed
+        self.assertEqual(1, await Minion.find({}).count())
@@ -1,9 +1,15 @@
+import asyncio
+import pickle
 from ..models.storable_model import StorableModel
+from ..models.base_model import ABORT_SAVE
 from ..models.fields import StringField, Field, ObjectIdField
 from ..db import ObjectsCursor
+from ..errors import DoNotSave, ModelDestroyed
 from ..decorators import api_field, model_cached_method
+from ..context import ctx
+from ..cache import MemcachedCache
 from .mongo_mock_test import MongoMockTest
-from mongey.cache import TraceCache
+from .test_cache import FakeMemcachedClient
 
 
 CALLABLE_DEFAULT_VALUE = 4
@@ -20,14 +26,53 @@ class TestModel(StorableModel):
     callable_default_field = Field(default=callable_default)
 
 
+class FakeMemcachedServer:
+    """
+    Serves memcached get and set commands, the values set are not stored.
+    Every reply is delayed
+    """
+
+    def __init__(self, data, delay):
+        self.data = data
+        self.delay = delay
+        self.server = None
+        self.received = asyncio.Event()
+
+    async def start(self) -> str:
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        host, port = self.server.sockets[0].getsockname()[:2]
+        return f"{host}:{port}"
+
+    async def stop(self) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        while line := await reader.readline():
+            self.received.set()
+            await asyncio.sleep(self.delay)
+            cmd, *args = line.split()
+            if cmd == b"set":
+                await reader.readexactly(int(args[3]) + 2)
+                writer.write(b"STORED\r\n")
+            else:
+                for key in args:
+                    if key in self.data:
+                        value = self.data[key]
+                        writer.write(b"VALUE %s 0 %d\r\n%s\r\n" % (key, len(value), value))
+                writer.write(b"END\r\n")
+            await writer.drain()
+        writer.close()
+
+
 class TestStorableModel(MongoMockTest):
 
     async def asyncSetUp(self) -> None:
         await super().asyncSetUp()
-        await TestModel.destroy_all()
+        await self._fast_truncate(TestModel)
 
     async def asyncTearDown(self) -> None:
-        await TestModel.destroy_all()
+        await self._fast_truncate(TestModel)
         await super().asyncTearDown()
 
     async def test_defaults(self):
@@ -61,17 +106,20 @@ class TestStorableModel(MongoMockTest):
         await TestModel.update_many(
             {"field1": "original_value"}, {"$set": {"field2": "mymodel_updated"}}
         )
-        await model1.reload()
-        await model2.reload()
-        await model3.reload()
+        await self.reload_many(TestModel, [model1, model2, model3])
 
         self.assertEqual(model1.field2, "mymodel_updated")
         self.assertEqual(model2.field2, "mymodel_updated")
         self.assertEqual(model3.field2, "mymodel_update_test")
 
+        await TestModel.destroy_many({"_id": model3.id})
+        model1.field2 = "local_change"
+        with self.assertRaises(ModelDestroyed):
+            await self.reload_many(TestModel, [model1, model3])
+        self.assertEqual(model1.field2, "local_change")
+
     async def test_invalidate(self):
-        from mongey.context import ctx
-        tc: TraceCache = ctx.l1_cache
+        tc = self.trace_cache
 
         class Model(StorableModel):
             field1 = StringField()
@@ -84,12 +132,12 @@ class TestStorableModel(MongoMockTest):
         tc.reset()
 
         await model.save()
-        tc.called_once("delete", f"model.{model.id}")
-        tc.called_once("delete", f"model.value")
+        ops = tc.snapshot_ops()
+        tc.assert_called(ops, "delete", f"model.{model.id}")
+        tc.assert_called(ops, "delete", "model.value")
 
     async def test_invalidate_cached_method(self):
-        from mongey.context import ctx
-        tc: TraceCache = ctx.l1_cache
+        tc = self.trace_cache
 
         class User(StorableModel):
             first_name = StringField()
@@ -111,9 +159,200 @@ class TestStorableModel(MongoMockTest):
         tc.reset()
 
         await user.save()
-        tc.called_once("delete", "user.Dilan")
-        tc.called_once("delete", f"user.{user.id}")
-        tc.called_once("delete", f"user.{user.id}.full_name")
+        ops = tc.snapshot_ops()
+        tc.assert_called(ops, "delete", "user.Dilan")
+        tc.assert_called(ops, "delete", f"user.{user.id}")
+        tc.assert_called(ops, "delete", f"user.{user.id}.full_name")
+
+    async def test_invalidate_many(self):
+        tc = self.trace_cache
+
+        class Account(StorableModel):
+            login = StringField()
+
+            KEY_FIELD = "login"
+
+            @model_cached_method
+            async def greeting(self):
+                return f"Hi {self.login}"
+
+        accounts = [Account({"login": login}) for login in ("alice", "bob")]
+        for account in accounts:
+            await account.save()
+        tc.reset()
+
+        await Account.destroy_many({})
+        ops = tc.snapshot_ops()
+        for account in accounts:
+            tc.assert_called(ops, "delete", f"account.{account.login}")
+            tc.assert_called(ops, "delete", f"account.{account.id}")
+            tc.assert_called(ops, "delete", f"account.{account.id}.greeting")
+
+    def test_cached_methods_per_class(self):
+        class Author(StorableModel):
+            @model_cached_method
+            async def books(self):
+                return []
+
+        class Poet(Author):
+            @model_cached_method
+            async def poems(self):
+                return []
+
+        class Reader(StorableModel):
+            pass
+
+        self.assertEqual(Author._cached_methods, frozenset({"books"}))
+        self.assertEqual(Poet._cached_methods, frozenset({"books", "poems"}))
+        self.assertEqual(Reader._cached_methods, frozenset())
+
+    async def test_cached_method_lookup_cancelled(self):
+        started = asyncio.Event()
+        calls = 0
+
+        class Report(StorableModel):
+            @model_cached_method
+            async def summary(self):
+                nonlocal calls
+                calls += 1
+                started.set()
+                await asyncio.sleep(0.01)
+                return "summary"
+
+        report = Report()
+        await report.save()
+        # another instance of the same document, no instance memo is shared
+        same_report = Report({"_id": report.id})
+
+        leader = asyncio.ensure_future(report.summary())
+        await started.wait()
+        waiter = asyncio.ensure_future(same_report.summary())
+        await asyncio.sleep(0)
+        leader.cancel()
+
+        # the waiter wasn't cancelled and gets the value of the very same lookup
+        self.assertEqual(await waiter, "summary")
+        self.assertEqual(calls, 1)
+        with self.assertRaises(asyncio.CancelledError):
+            await leader
+        await Report.destroy_all()
+
+    async def test_cached_method_instance_memo(self):
+        tc = self.trace_cache
+
+        class User(StorableModel):
+            first_name = StringField()
+            last_name = StringField()
+
+            @model_cached_method
+            async def full_name(self):
+                return f"{self.first_name} {self.last_name}"
+
+        user = User.create(first_name="Bob", last_name="Dilan")
+        await user.save()
+
+        self.assertEqual(await user.full_name(), "Bob Dilan")
+        self.assertEqual(await user.full_name(), "Bob Dilan")
+        tc.called_once("get", f"user.{user.id}.full_name")
+
+        user.first_name = "Robert"
+        await user.save()
+        self.assertEqual(await user.full_name(), "Robert Dilan")
+
+    async def test_cached_method_instance_memo_staleness(self):
+        calls = 0
+
+        class User(StorableModel):
+            name = StringField()
+
+            @model_cached_method
+            async def nickname(self):
+                nonlocal calls
+                calls += 1
+                return self.name and self.name.lower()
+
+        user = User.create(name="Bob")
+        await user.save()
+        self.assertEqual(await user.nickname(), "bob")
+
+        # bulk updates don't reach live instances, the memoized value stays
+        await User.update_many({"_id": user.id}, {"$set": {"name": "Robert"}})
+        self.assertEqual(await user.nickname(), "bob")
+        self.assertEqual(calls, 1)
+        await user.reload()
+        self.assertEqual(await user.nickname(), "robert")
+
+        # None is not memoized
+        user.name = None
+        await user.save()
+        self.assertIsNone(await user.nickname())
+        self.assertIsNone(await user.nickname())
+        self.assertEqual(calls, 4)
+
+    async def test_cached_method_keeps_l2_connection(self):
+        class Report(StorableModel):
+            @model_cached_method
+            async def summary(self):
+                return "computed"
+
+        report = Report()
+        await report.save()
+
+        server = FakeMemcachedServer({b"b": pickle.dumps("BBB")}, delay=0.01)
+
+        class L1Client(FakeMemcachedClient):
+            async def get(self, key):
+                # L1 hits while the L2 get is waiting for its reply
+                await server.received.wait()
+                return await super().get(key)
+
+        l1 = MemcachedCache(["localhost"])
+        l1._backends = [L1Client({(report._cache_key_id_prefix + "summary").encode(): pickle.dumps("cached")})]
+        # a single connection, a reply left unread would be read by the next get
+        l2 = MemcachedCache([await server.start()], pool_size=1)
+
+        l1_cache, l2_cache = ctx._l1_cache, ctx._l2_cache
+        ctx._l1_cache, ctx._l2_cache = l1, l2
+        try:
+            self.assertEqual(await report.summary(), "cached")
+            self.assertEqual(await l2.get("b"), "BBB")
+
+            # L1 misses and the caller is cancelled while the L2 get is waiting for its reply
+            other_report = Report()
+            await other_report.save()
+            server.received.clear()
+            caller = asyncio.ensure_future(other_report.summary())
+            await server.received.wait()
+            caller.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await caller
+            self.assertEqual(await l2.get("b"), "BBB")
+        finally:
+            ctx._l1_cache, ctx._l2_cache = l1_cache, l2_cache
+            await l2._backends[0].close()
+            await server.stop()
+            await Report.destroy_all()
+
+    async def test_cached_method_single_flight(self):
+        calls = 0
+
+        class User(StorableModel):
+            name = StringField()
+
+            @model_cached_method
+            async def slow_name(self):
+                nonlocal calls
+                calls += 1
+                await asyncio.sleep(0)
+                return self.name
+
+        user = User.create(name="Bob")
+        await user.save()
+        copies = [await User.get(user.id) for _ in range(3)]
+
+        values = await asyncio.gather(*[u.slow_name() for u in copies])
+        self.assertEqual(values, ["Bob", "Bob", "Bob"])
+        self.assertEqual(calls, 1)
 
     async def test_update(self):
         model = TestModel.create(field1="original_value", field2="mymodel_update_test")
@@ -123,13 +362,33 @@ class TestStorableModel(MongoMockTest):
         model = await TestModel.find_one({"_id": id_})
         self.assertEqual(model.field2, "mymodel_updated")
 
+    async def test_abort_save(self):
+        class AbortableModel(StorableModel):
+            name = StringField()
+
+            async def _before_save(self):
+                if self.name == "abort":
+                    return ABORT_SAVE
+                if self.name == "raise":
+                    raise DoNotSave("not saving")
+
+        for name in ("abort", "raise"):
+            model = AbortableModel({"name": name})
+            await model.save()
+            self.assertTrue(model.is_new)
+
+        model = AbortableModel({"name": "save"})
+        await model.save()
+        self.assertFalse(model.is_new)
+        self.assertEqual(await AbortableModel.find().count(), 1)
+        await AbortableModel.destroy_all()
+
     async def test_count(self):
         class Model(StorableModel):
             a = Field()
 
-        for i in range(100):
-            m = Model.create(a=i)
-            await m.save()
+        models = [Model.create(a=i) for i in range(100)]
+        await asyncio.gather(*(m.save() for m in models))
 
         cur = Model.find({})
         count = await cur.count()
@@ -151,20 +410,25 @@ class TestStorableModel(MongoMockTest):
             def deps(self) -> ObjectsCursor["DepModel"]:
                 return DepModel.find({"master_id": self.id})
 
+            @api_field
+            def no_deps(self) -> ObjectsCursor["DepModel"]:
+                # the annotation is not trusted, the returned value is checked
+                return None
+
         master = MasterModel.create(name="master")
         await master.save()
 
-        for i in range(10):
-            dep = DepModel.create(a=i, master_id=master.id)
-            await dep.save()
+        deps = [DepModel.create(a=i, master_id=master.id) for i in range(10)]
+        await asyncio.gather(*(dep.save() for dep in deps))
 
         # check normal method usage
         deps = await master.deps().all()
         self.assertEqual(len(deps), 10)
 
         # check deps are accessible via API
-        dct = await master.to_dict_ext(fields=["id", "name", "deps"])
+        dct = await master.to_dict_ext(fields=["id", "name", "deps", "no_deps"])
         self.assertEqual(len(dct["deps"]), 10)
+        self.assertIsNone(dct["no_deps"])
 
     async def test_find_by_none_raises(self):
         with self.assertRaises(ValueError):
@@ -173,12 +437,17 @@ class TestStorableModel(MongoMockTest):
             _ = await TestModel.cache_get(None, ValueError("value error"))
 
     async def test_find_ids(self):
-        tma = TestModel.create(field2="a")
-        await tma.save()
-        tmb = TestModel.create(field2="b")
-        await tmb.save()
-        tmc = TestModel.create(field2="c")
-        await tmc.save()
+        tma, tmb, tmc = await self.bulk_insert(TestModel, [{"field2": "a"}, {"field2": "b"}, {"field2": "c"}])
 
         self.assertCountEqual([tma.id, tmb.id, tmc.id], await TestModel.find_ids({}))
         self.assertCountEqual([tma.id], await TestModel.find_ids({"field2": "a"}))
+        self.assertEqual(len(await TestModel.find_ids({}, max_count=2)), 2)
+
+    async def test_counter_next_value(self):
+        from ..models.counter import Counter
+        await Counter.get("test_counter_next_value")
+        self.assertEqual(await Counter.next_value("test_counter_next_value"), 2)
+        self.assertEqual(await Counter.get_counter("test_counter_next_value"), 3)
+        cnt = await Counter.get("test_counter_next_value")
+        self.assertEqual(cnt.counter, 4)
+        await cnt.drop()
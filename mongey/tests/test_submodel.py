@@ -1,4 +1,4 @@
-import itertools
+import asyncio
 from bson import ObjectId
 from mongey.models.submodel import StorableSubmodel
 from mongey.models.fields import Field
@@ -30,7 +30,7 @@ class TestSubmodel(MongoMockTest):
 
     async def asyncSetUp(self) -> None:
         await super().asyncSetUp()
-        await TestBaseModel.destroy_all()
+        await self._fast_truncate(TestBaseModel)
 
     async def test_wrong_input(self):
         with self.assertRaises(WrongSubmodel):
@@ -83,18 +83,16 @@ class TestSubmodel(MongoMockTest):
         m1 = Submodel1({})
         m2 = Submodel2({})
 
-        self.assertCountEqual(m1._fields, ["id", "submodel", "field1", "field2", "field3"])
-        self.assertCountEqual(m2._fields, ["id", "submodel", "field1", "field2", "field4"])
+        self.assertEqual(set(m1._fields), {"id", "submodel", "field1", "field2", "field3"})
+        self.assertEqual(set(m2._fields), {"id", "submodel", "field1", "field2", "field4"})
+        # the fields are shared by the class instances and can't be modified
+        with self.assertRaises(TypeError):
+            m1._fields["field4"] = Field()
 
-    @staticmethod
-    async def _create_objs():
+    async def _create_objs(self):
         """Returns two lists of objects. Objects in the same positions only differ in their submodel"""
-        values = [1, 2, 3]
-        objs1 = [Submodel1({"field1": v, "field2": v}) for v in values]
-        objs2 = [Submodel2({"field1": v, "field2": v}) for v in values]
-        for obj in itertools.chain(objs1, objs2):
-            await obj.save()
-        return objs1, objs2
+        rows = [{"field1": v, "field2": v} for v in [1, 2, 3]]
+        return await asyncio.gather(self.bulk_insert(Submodel1, rows), self.bulk_insert(Submodel2, rows))
 
     async def test_isolation_find(self):
         self.maxDiff = None
@@ -121,6 +119,12 @@ class TestSubmodel(MongoMockTest):
             [objs1[0], objs2[0]],
         )
 
+        # the query is not modified and can be reused with another submodel
+        query = {"field1": objs1[0].field1}
+        self.assertCountEqual(await Submodel1.find(query).all(), [objs1[0]])
+        self.assertCountEqual(await Submodel2.find(query).all(), [objs2[0]])
+        self.assertEqual(query, {"field1": objs1[0].field1})
+
     async def test_isolation_update(self):
         objs1, objs2 = await self._create_objs()
         obj1 = objs2[0]
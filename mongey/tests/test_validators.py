@@ -42,6 +42,8 @@ class TestValidators(IsolatedAsyncioTestCase):
 
         model.field = "   auto-trimmed   "
         self.assertEqual(model.field, "auto-trimmed")
+        # the same applies to the values passed on construction
+        self.assertEqual(Model({"field": "  from-attrs  "}).field, "from-attrs")
 
         class Model(BaseModel):
             field = StringField(auto_trim=False)
@@ -64,6 +66,15 @@ class TestValidators(IsolatedAsyncioTestCase):
         model.field = "1234"
         await model.validate_all()
 
+        class Model(BaseModel):
+            field = StringField(re_match=r"\d+", re_fullmatch=True)
+
+        model = Model({"field": "1234a"})
+        with self.assertRaises(ValidationError):
+            await model.validate_all()
+        model.field = "1234"
+        await model.validate_all()
+
     async def test_list_field(self):
         class Model(BaseModel):
             field = ListField()
@@ -105,6 +116,17 @@ class TestValidators(IsolatedAsyncioTestCase):
             await model.validate_all()
         model.field = -34
         await model.validate_all()
+        # bool is a subclass of int, but not a valid IntField value
+        model.field = True
+        with self.assertRaises(ValidationError):
+            await model.validate_all()
+
+        class Model(BaseModel):
+            field = IntField(strict=False)
+
+        # non-strict fields accept int subclasses as well
+        model = Model({"field": True})
+        await model.validate_all()
 
         class Model(BaseModel):
             field = IntField(min_value=0, max_value=10)
@@ -194,3 +216,82 @@ class TestValidators(IsolatedAsyncioTestCase):
             await model.validate_all()
         model.field = None
         await model.validate_all()
+
+    async def test_custom_validate_sync(self):
+        class EvenField(IntField):
+            __slots__ = ()
+
+            def validate_sync(self, obj):
+                super().validate_sync(obj)
+                if obj.__dict__.get(self.name, 0) % 2:
+                    raise ValidationError(f"field {self.name} must be even")
+
+        class Model(BaseModel):
+            name = StringField(required=True)
+            value = EvenField(default=0)
+
+        model = Model({"name": "a", "value": 2})
+        await model.validate_all()
+        model.value = 3
+        with self.assertRaises(ValidationError):
+            await model.validate_all()
+        model.value = "4"
+        with self.assertRaises(ValidationError):
+            await model.validate_all()
+
+    async def test_validate_many(self):
+        class Model(BaseModel):
+            name = StringField(required=True)
+            count = IntField(min_value=0)
+
+        valid = [Model({"name": "a", "count": 1}), Model({"name": "b"})]
+        await Model.validate_many(valid)
+        await Model.validate_many([])
+
+        with self.assertRaises(ValidationError):
+            await Model.validate_many(valid + [Model({"name": "c", "count": -1})])
+        with self.assertRaises(ValidationError):
+            await Model.validate_many([Model({"count": 1})] + valid)
+
+    def test_validate_all_sync(self):
+        class Model(BaseModel):
+            field = StringField(required=True)
+
+        model = Model({"field": "value"})
+        model.validate_all_sync()
+        model.field = None
+        with self.assertRaises(ValidationError):
+            model.validate_all_sync()
+
+        class AsyncField(StringField):
+            __slots__ = ()
+
+            async def validate(self, obj):
+                await super().validate(obj)
+
+        class AsyncModel(BaseModel):
+            field = AsyncField()
+
+        with self.assertRaises(RuntimeError):
+            AsyncModel().validate_all_sync()
+
+    async def test_simple_patterns(self):
+        # simple patterns are checked without the regex engine, with the same results
+        class Model(BaseModel):
+            digits = StringField(re_match=r"^\d+$", auto_trim=False)
+            letters = StringField(re_match=r"^[a-zA-Z]+$", re_fullmatch=True, auto_trim=False)
+
+        for digits, letters, valid in [
+            ("123", "abc", True),
+            ("123\n", "abc", True),
+            ("12a", "abc", False),
+            ("", "abc", False),
+            ("123", "abc\n", False),
+            ("123", "abcé", False),
+        ]:
+            model = Model({"digits": digits, "letters": letters})
+            if valid:
+                await model.validate_all()
+            else:
+                with self.assertRaises(ValidationError):
+                    await model.validate_all()
@@ -10,7 +10,7 @@ TBaseModel = TypeVar("TBaseModel", bound="BaseModel")
 TModelType = Type[TModel]
 TPydanticModel = TypeVar("TPydanticModel", bound=PydanticModel)
 
-CacheEngineName = Literal["no_cache", "simple", "request_local", "memcached", "trace"]
+CacheEngineName = Literal["no_cache", "simple", "request_local", "memcached", "memcached_batching", "trace"]
 TCache = TypeVar("TCache", bound="AbstractCache")
 
 T = TypeVar("T")  # any type
@@ -1,21 +1,57 @@
+import re
+import time
 from bson.objectid import ObjectId, InvalidId
-from datetime import datetime
+from datetime import datetime, timedelta
 from logging import getLogger
+from functools import lru_cache
 
 NilObjectId: ObjectId = ObjectId("000000000000000000000000")
 
 log = getLogger("mongey")
 
 
+_EPOCH = datetime(1970, 1, 1)
+
+# (milliseconds since epoch, datetime) returned by the latest now() call,
+# kept in a single tuple so that threads never see a mismatched pair
+_last_now: tuple[int, datetime] = (0, _EPOCH)
+
+
 # Mongo stores datetime rounded to milliseconds as its datetime
 # capabilities are limited by v8 engine
 def now() -> datetime:
-    dt = datetime.utcnow()
-    dt = dt.replace(microsecond=dt.microsecond // 1000 * 1000)
+    global _last_now
+    # naive UTC, truncated to milliseconds with integer arithmetic
+    ms = time.time_ns() // 1_000_000
+    last_ms, last_dt = _last_now
+    if ms == last_ms:
+        # datetimes are immutable, the calls within the same millisecond share one
+        return last_dt
+    dt = _EPOCH + timedelta(milliseconds=ms)
+    _last_now = (ms, dt)
     return dt
 
 
+RESOLVE_ID_CACHE_SIZE: int = 4096
+
+# the canonical ObjectId representation, i.e. the one str(ObjectId(...)) returns
+_OBJECT_ID_RE = re.compile(r"[0-9a-f]{24}")
+
+
+@lru_cache(maxsize=RESOLVE_ID_CACHE_SIZE)
+def _resolve_str_id(obj_id: str) -> ObjectId | str:
+    # ObjectIds are immutable, so the cached ones are safe to share.
+    # Only the canonical form resolves, so that an id doesn't get
+    # a different string representation after the round trip
+    if _OBJECT_ID_RE.fullmatch(obj_id):
+        return ObjectId(obj_id)
+    return obj_id
+
+
 def resolve_id(obj_id: str | ObjectId | None) -> ObjectId | str | None:
+    # the same string ids tend to be resolved over and over again
+    if type(obj_id) is str:
+        return _resolve_str_id(obj_id)
     # ObjectId(None) generates a new unique object id
     # We need to override that and return None instead
     if obj_id is not None and not isinstance(obj_id, ObjectId):